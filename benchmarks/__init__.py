@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+"""性能基准测试
+
+包含青龙面板Open API的本地模拟服务和QinglongPanel的基准测试
+"""
+
+__all__ = []
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""青龙面板Open API的本地模拟服务
+
+支持 /open/auth/token、/open/envs（GET/POST/PUT）、/open/envs/enable、/open/envs/disable，
+以及用于Cookie有效性检测的 /jd/userinfo。可配置响应延迟、错误率、连接重置率和环境变量数量：
+
+    python -m benchmarks.mock_qinglong --port 5700 --envs 1000 --latency 0.02 --error-rate 0.01 --reset-rate 0.01
+"""
+
+import argparse
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+CLIENT_ID = 'mock_client_id'
+CLIENT_SECRET = 'mock_client_secret'
+
+def _now_iso():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + '000Z'
+
+class MockQinglongState:
+    """模拟面板的数据和故障配置，所有请求线程共享"""
+
+    def __init__(self, env_count: int = 10, jd_cookie_ratio: float = 0.5, latency: float = 0.0,
+                 error_rate: float = 0.0, reset_rate: float = 0.0, token_ttl: float = 30 * 86400):
+        self.latency = latency
+        self.error_rate = error_rate
+        # 不返回响应、直接重置连接的概率，模拟网络中断
+        self.reset_rate = reset_rate
+        self.token_ttl = token_ttl
+        self.lock = threading.Lock()
+        self.tokens = {}
+        self.envs = {}
+        self.next_id = 1
+        self.request_counts = {}
+        self.random = random.Random(0)
+        jd_cookie_count = int(env_count * jd_cookie_ratio)
+        for index in range(env_count):
+            if index < jd_cookie_count:
+                self.add_env('JD_COOKIE', f'pt_key=AAJ{index:08d}; pt_pin=jd_user{index};', f'jd_user{index}')
+            else:
+                self.add_env(f'OTHER_ENV_{index}', 'x' * 64, '')
+
+    def add_env(self, name: str, value: str, remarks: str, status: int = 0) -> dict:
+        env = {
+            'id': self.next_id,
+            'name': name,
+            'value': value,
+            'remarks': remarks,
+            'status': status,
+            'timestamp': _now_iso(),
+            'createdAt': _now_iso(),
+            'updatedAt': _now_iso(),
+        }
+        self.envs[env['id']] = env
+        self.next_id += 1
+        return env
+
+    def issue_token(self) -> dict:
+        token = f'mock-token-{self.random.getrandbits(64):016x}'
+        expiration = int(time.time() + self.token_ttl)
+        self.tokens[token] = expiration
+        return {'token': token, 'token_type': 'Bearer', 'expiration': expiration}
+
+    def is_authorized(self, header: str) -> bool:
+        if not header or not header.startswith('Bearer '):
+            return False
+        expiration = self.tokens.get(header[len('Bearer '):])
+        return expiration is not None and expiration > time.time()
+
+class MockQinglongHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体一次写出，避免小包延迟影响测量
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self) -> MockQinglongState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, data: dict):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        with self.state.lock:
+            key = f'{method} {url.path}'
+            self.state.request_counts[key] = self.state.request_counts.get(key, 0) + 1
+            fail = self.state.random.random() < self.state.error_rate
+            reset = self.state.random.random() < self.state.reset_rate
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if reset:
+            self._reset_connection()
+            return
+        # 先读完请求体，注入错误后长连接仍可继续使用
+        body = self._read_json() if method in ('POST', 'PUT') else None
+        if fail:
+            self._send(500, {'code': 500, 'message': 'injected error'})
+            return
+
+        if url.path == '/jd/userinfo':
+            self._jd_userinfo()
+        elif url.path == '/open/auth/token':
+            self._auth_token(parse_qs(url.query))
+        elif not self.state.is_authorized(self.headers.get('Authorization')):
+            self._send(401, {'code': 401, 'message': 'UnauthorizedError'})
+        elif url.path == '/open/envs' and method == 'GET':
+            self._get_envs(parse_qs(url.query))
+        elif url.path == '/open/envs' and method == 'POST':
+            self._create_envs(body)
+        elif url.path == '/open/envs' and method == 'PUT':
+            self._update_env(body)
+        elif url.path in ('/open/envs/enable', '/open/envs/disable') and method == 'PUT':
+            self._set_status(body, 0 if url.path.endswith('enable') else 1)
+        else:
+            self._send(404, {'code': 404, 'message': 'not found'})
+
+    def _reset_connection(self):
+        # SO_LINGER为0时关闭连接会发送RST，客户端收到Connection reset
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        self.close_connection = True
+
+    def _jd_userinfo(self):
+        # pt_key以expired开头的Cookie视为已失效
+        cookie = self.headers.get('Cookie', '')
+        self._send(200, {'retcode': '1001' if 'pt_key=expired' in cookie else '0'})
+
+    def _auth_token(self, query):
+        if query.get('client_id', [''])[0] != CLIENT_ID or query.get('client_secret', [''])[0] != CLIENT_SECRET:
+            self._send(200, {'code': 400, 'message': 'client_id或client_secret有误'})
+            return
+        with self.state.lock:
+            data = self.state.issue_token()
+        self._send(200, {'code': 200, 'data': data})
+
+    def _get_envs(self, query):
+        search_value = query.get('searchValue', [''])[0]
+        with self.state.lock:
+            envs = [
+                dict(env) for env in self.state.envs.values()
+                if not search_value or search_value in env['name']
+                or search_value in env['value'] or search_value in env['remarks']
+            ]
+        self._send(200, {'code': 200, 'data': envs})
+
+    def _create_envs(self, body):
+        with self.state.lock:
+            created = [self.state.add_env(env['name'], env['value'], env.get('remarks', '')) for env in body]
+        self._send(200, {'code': 200, 'data': created})
+
+    def _update_env(self, body):
+        with self.state.lock:
+            env = self.state.envs.get(body.get('id'))
+            if env is None:
+                self._send(200, {'code': 400, 'message': '环境变量不存在'})
+                return
+            env.update(name=body['name'], value=body['value'], remarks=body.get('remarks', ''), updatedAt=_now_iso())
+            env = dict(env)
+        self._send(200, {'code': 200, 'data': env})
+
+    def _set_status(self, body, status: int):
+        with self.state.lock:
+            for env_id in body:
+                if env_id in self.state.envs:
+                    self.state.envs[env_id]['status'] = status
+        self._send(200, {'code': 200, 'message': 'success'})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+class MockQinglongServer:
+    """在后台线程中运行的模拟面板"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, **state_options):
+        self.httpd = ThreadingHTTPServer((host, port), MockQinglongHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = MockQinglongState(**state_options)
+        self._thread = None
+
+    @property
+    def state(self) -> MockQinglongState:
+        return self.httpd.state
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='青龙面板Open API模拟服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5700)
+    parser.add_argument('--envs', type=int, default=100, help='初始环境变量数量')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的额外延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='返回500错误的概率')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='直接重置连接的概率')
+    args = parser.parse_args(argv)
+
+    server = MockQinglongServer(args.host, args.port, env_count=args.envs, latency=args.latency,
+                                error_rate=args.error_rate, reset_rate=args.reset_rate)
+    print(f'模拟青龙面板已启动: {server.url}  client_id={CLIENT_ID}  client_secret={CLIENT_SECRET}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == '__main__':
+    main()
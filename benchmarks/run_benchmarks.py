@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""QinglongPanel基准测试
+
+针对本地模拟面板，在不同环境变量规模下测量 get_env_list、sync_cookie 和批量同步，
+结果（延迟百分位、吞吐量、错误数）以JSON输出：
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --sizes 10 1000 --iterations 50 --latency 0.01 --output bench.json
+    python -m benchmarks.run_benchmarks --sizes 10 --resilience --fault-rate 0.1
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# 使用临时数据目录，避免读写用户的数据库
+if not os.environ.get('JD_HELPER_HOME'):
+    os.environ['JD_HELPER_HOME'] = tempfile.mkdtemp(prefix='jd_helper_bench_')
+
+from benchmarks.mock_qinglong import MockQinglongServer, CLIENT_ID, CLIENT_SECRET
+from core.qinglong_panel import QinglongPanel
+from core.http_transport import get_transport
+from core.resilience import RetryPolicy, CircuitBreaker, get_panel_guard
+
+DEFAULT_SIZES = [10, 1000, 10000]
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """最近秩法计算百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def summarize(name: str, env_count: int, latencies: list, errors: int, wall_time: float, operations: int = None) -> dict:
+    """汇总一组测量结果，延迟单位为毫秒"""
+    values = sorted(latency * 1000 for latency in latencies)
+    operations = operations if operations is not None else len(latencies)
+    return {
+        'scenario': name,
+        'env_count': env_count,
+        'iterations': len(latencies),
+        'errors': errors,
+        'min_ms': round(values[0], 3) if values else 0.0,
+        'mean_ms': round(sum(values) / len(values), 3) if values else 0.0,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p90_ms': round(percentile(values, 90), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3) if values else 0.0,
+        'throughput_ops': round(operations / wall_time, 2) if wall_time else 0.0,
+    }
+
+def measure(func, iterations: int, before=None):
+    """重复执行func，before在每次计时前执行且不计入耗时"""
+    latencies = []
+    errors = 0
+    wall_time = 0.0
+    for _ in range(iterations):
+        if before:
+            before()
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            errors += 1
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        wall_time += elapsed
+    return latencies, errors, wall_time
+
+def run_size(env_count: int, args) -> list:
+    results = []
+    with MockQinglongServer(env_count=env_count, latency=args.latency, error_rate=args.error_rate) as server:
+        get_panel_guard(server.url).set_rate(args.rate)
+        panel = QinglongPanel(config=(server.url, CLIENT_ID, CLIENT_SECRET, None, None))
+        panel.get_env_list()
+
+        latencies, errors, wall_time = measure(panel.get_env_list, args.iterations)
+        results.append(summarize('get_env_list', env_count, latencies, errors, wall_time))
+
+        # 每次同步前让镜像失效，测量包含下载环境变量列表的完整同步
+        counter = iter(range(10 ** 9))
+        latencies, errors, wall_time = measure(
+            lambda: panel.sync_cookie(f'pt_key=AAJ{next(counter)}; pt_pin=jd_user0;', 'jd_user0'),
+            args.iterations,
+            before=panel.env_mirror.invalidate
+        )
+        results.append(summarize('sync_cookie_cold', env_count, latencies, errors, wall_time))
+
+        # 镜像有效时的同步，只有写请求
+        latencies, errors, wall_time = measure(
+            lambda: panel.sync_cookie(f'pt_key=AAJ{next(counter)}; pt_pin=jd_user0;', 'jd_user0'),
+            args.iterations
+        )
+        results.append(summarize('sync_cookie_warm', env_count, latencies, errors, wall_time))
+
+        # 批量同步：一半账号已存在于面板，一半为新账号
+        def bulk_sync():
+            batch = next(counter)
+            accounts = [
+                (f'pt_key=AAJ{batch}; pt_pin=bench{batch}_{index};',
+                 f'jd_user{index}' if index % 2 == 0 else f'bench{batch}_{index}')
+                for index in range(args.accounts)
+            ]
+            failed = [result for result in panel.sync_cookies(accounts) if not result.success]
+            if failed:
+                raise Exception(failed[0].error)
+
+        bulk_iterations = max(args.iterations // 5, 1)
+        latencies, errors, wall_time = measure(bulk_sync, bulk_iterations, before=panel.env_mirror.invalidate)
+        results.append(summarize(f'sync_cookies_{args.accounts}', env_count, latencies, errors, wall_time,
+                                 operations=bulk_iterations * args.accounts))
+    return results
+
+def run_resilience(args) -> list:
+    """故障注入场景：一半故障为500错误、一半为连接重置，比较不重试和默认重试策略的成功率，
+    再停止面板测量熔断后请求失败的速度"""
+    results = []
+    policies = [
+        ('no_retry', RetryPolicy(max_retries=0)),
+        ('retry', RetryPolicy(backoff_base=0.01)),
+    ]
+    for name, policy in policies:
+        with MockQinglongServer(env_count=10, latency=args.latency, error_rate=args.fault_rate / 2,
+                                reset_rate=args.fault_rate / 2) as server:
+            guard = get_panel_guard(server.url)
+            guard.set_rate(args.rate)
+            # 只测量重试效果，不让熔断干扰
+            guard.breaker.failure_threshold = 10 ** 9
+            panel = QinglongPanel(config=(server.url, CLIENT_ID, CLIENT_SECRET, None, None), retry_policy=policy)
+            counter = iter(range(10 ** 9))
+            latencies, errors, wall_time = measure(
+                lambda: panel.sync_cookie(f'pt_key=AAJ{next(counter)}; pt_pin=jd_user0;', 'jd_user0'),
+                args.iterations * 5
+            )
+            summary = summarize(f'sync_cookie_faults_{name}', 10, latencies, errors, wall_time)
+            summary['fault_rate'] = args.fault_rate
+            results.append(summary)
+
+    server = MockQinglongServer(env_count=10).start()
+    url = server.url
+    panel = QinglongPanel(config=(url, CLIENT_ID, CLIENT_SECRET, None, None),
+                          connect_timeout=1, retry_policy=RetryPolicy(backoff_base=0.01))
+    panel.get_env_list()
+    server.stop()
+    # 丢弃连接池中仍然可用的长连接，之后的请求都会连接失败
+    get_transport(url).close()
+    guard = get_panel_guard(url)
+    guard.breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=60)
+    latencies, errors, wall_time = measure(panel.get_env_list, args.iterations)
+    summary = summarize('panel_down_circuit_breaker', 10, latencies, errors, wall_time)
+    summary['breaker_state'] = guard.breaker.state
+    results.append(summary)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='QinglongPanel基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='环境变量数量')
+    parser.add_argument('--iterations', type=int, default=20, help='每个场景的执行次数')
+    parser.add_argument('--accounts', type=int, default=50, help='批量同步的账号数')
+    parser.add_argument('--latency', type=float, default=0.0, help='模拟面板每个请求的额外延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='模拟面板返回500错误的概率')
+    parser.add_argument('--rate', type=float, default=None, help='每个面板每秒最多请求数，默认不限流')
+    parser.add_argument('--resilience', action='store_true', help='同时运行故障注入和熔断场景')
+    parser.add_argument('--fault-rate', type=float, default=0.1, help='故障注入场景中请求失败的概率')
+    parser.add_argument('--output', help='结果输出文件，默认输出到标准输出')
+    args = parser.parse_args(argv)
+
+    report = {
+        'config': vars(args),
+        'python': sys.version.split()[0],
+        'results': [],
+    }
+    for env_count in args.sizes:
+        report['results'].extend(run_size(env_count, args))
+    if args.resilience:
+        report['results'].extend(run_resilience(args))
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,10 +3,25 @@
 """核心功能模块
 
 包含Cookie管理、青龙面板交互等核心功能实现
+
+导出的类按需导入，命令行模式只使用QinglongPanel时不会加载PyQt6
 """
 
-from .cookie_manager import CookieManager
-from .qinglong_panel import QinglongPanel
-from .web_view_manager import WebViewManager
+import importlib
+
+_EXPORTS = {
+    'CookieManager': 'cookie_manager',
+    'QinglongPanel': 'qinglong_panel',
+    'WebViewManager': 'web_view_manager',
+    'JobExecutor': 'job_executor',
+    'AccountSession': 'account_session',
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = ['CookieManager', 'QinglongPanel', 'WebViewManager']
\ No newline at end of file
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f'.{module_name}', __name__)
+    return getattr(module, name)
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+"""命令行入口：python -m core"""
+
+import sys
+from core.cli import main
+
+sys.exit(main())
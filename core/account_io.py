@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import unquote
+from database.storage import get_storage
+from core.cookie_utils import parse_cookie_str, format_cookie_str, format_essential_cookies
+
+# 文件格式：每行一个Cookie字符串、JSON Lines、带表头的CSV
+FORMAT_TXT = 'txt'
+FORMAT_JSONL = 'jsonl'
+FORMAT_CSV = 'csv'
+FORMATS = (FORMAT_TXT, FORMAT_JSONL, FORMAT_CSV)
+# 按扩展名识别格式，其他扩展名按txt处理
+FORMAT_EXTENSIONS = {'.jsonl': FORMAT_JSONL, '.ndjson': FORMAT_JSONL, '.csv': FORMAT_CSV}
+# JSON Lines和CSV的字段
+FIELDS = ['user_pin', 'cookie', 'status', 'updated_at']
+STATUSES = ('active', 'expired')
+# 每个事务写入的账号数，同时也是同步到面板的批量大小
+DEFAULT_CHUNK_SIZE = 500
+
+@dataclass
+class ImportReport:
+    """一次导入的结果，errors中每一项为{'line': 行号, 'error': 错误信息}
+
+    imported为写入的不同账号数，同一账号出现多次时被后面的行覆盖的行计入skipped
+    """
+    total: int = 0
+    imported: int = 0
+    skipped: int = 0
+    synced: int = 0
+    errors: list = field(default_factory=list)
+    sync_errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__, elapsed=round(self.elapsed, 3), rows_per_second=round(self.rows_per_second, 1))
+
+@dataclass
+class ExportReport:
+    """一次导出的结果"""
+    exported: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.exported / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__, elapsed=round(self.elapsed, 3), rows_per_second=round(self.rows_per_second, 1))
+
+def detect_format(path: str) -> str:
+    """按文件扩展名识别格式"""
+    return FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), FORMAT_TXT)
+
+def validate_account(cookie: str, user_pin: str = None, status: str = None):
+    """校验一个账号，返回(user_pin, cookie, status)，不合法时抛出异常
+
+    返回的Cookie字符串中pt_pin为解码后的形式，与界面登录时保存的格式一致
+    """
+    cookie = (cookie or '').strip()
+    cookies = parse_cookie_str(cookie)
+    if not cookies.get('pt_key') or not cookies.get('pt_pin'):
+        raise Exception('缺少pt_key或pt_pin')
+    if user_pin and unquote(user_pin) != cookies['pt_pin']:
+        raise Exception(f'user_pin与Cookie中的pt_pin不一致: {user_pin}')
+    status = status or 'active'
+    if status not in STATUSES:
+        raise Exception(f'未知的账号状态: {status}')
+    return cookies['pt_pin'], format_cookie_str(cookies), status
+
+def iter_rows(f, fmt: str):
+    """逐行读取文件，生成(行号, user_pin, cookie, status, 解析错误)"""
+    if fmt == FORMAT_CSV:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or 'cookie' not in reader.fieldnames:
+            raise Exception('CSV文件缺少cookie列')
+        for row in reader:
+            # 行号包括表头
+            yield reader.line_num, row.get('user_pin'), row.get('cookie'), row.get('status'), None
+        return
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if fmt == FORMAT_TXT:
+            yield line_no, None, line, None, None
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, None, None, f'JSON格式错误: {str(e)}'
+            continue
+        if not isinstance(item, dict):
+            yield line_no, None, None, None, 'JSON行必须是对象'
+        elif 'cookie' in item:
+            yield line_no, item.get('user_pin'), item['cookie'], item.get('status'), None
+        else:
+            # 也接受只有pt_key和pt_pin字段的对象
+            cookie = format_essential_cookies({name: item.get(name, '') for name in ('pt_key', 'pt_pin')})
+            yield line_no, item.get('user_pin'), cookie, item.get('status'), None
+
+def import_accounts(f, fmt: str = FORMAT_TXT, storage=None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    panel_group=None, cancel_event: threading.Event = None) -> ImportReport:
+    """流式导入账号，每chunk_size个账号写入一次数据库
+
+    指定panel_group时，每批有效账号写入后立即批量同步到所有面板。
+    文件中同一账号出现多次时以最后一次为准
+    """
+    storage = storage or get_storage()
+    report = ImportReport()
+    start = time.perf_counter()
+    chunk = []
+    valid = 0
+    imported_pins = set()
+
+    def flush():
+        # 同一批中重复的账号只写入和同步最后一次
+        rows = list({row[0]: row for row in chunk}.values())
+        chunk.clear()
+        storage.upsert_cookies(rows)
+        imported_pins.update(user_pin for user_pin, _, _ in rows)
+        accounts = [
+            (format_essential_cookies(parse_cookie_str(cookie)), user_pin)
+            for user_pin, cookie, status in rows if status == 'active'
+        ]
+        if panel_group is not None and accounts:
+            _sync_chunk(panel_group, accounts, report, cancel_event)
+
+    for line_no, user_pin, cookie, status, error in iter_rows(f, fmt):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        report.total += 1
+        try:
+            if error:
+                raise Exception(error)
+            chunk.append(validate_account(cookie, user_pin, status))
+        except Exception as e:
+            report.errors.append({'line': line_no, 'error': str(e)})
+            continue
+        valid += 1
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    report.imported = len(imported_pins)
+    report.skipped = valid - report.imported
+    report.elapsed = time.perf_counter() - start
+    return report
+
+def _sync_chunk(panel_group, accounts: list, report: ImportReport, cancel_event: threading.Event = None):
+    try:
+        panel_results = panel_group.sync_cookies(accounts, cancel_event)
+    except Exception as e:
+        report.sync_errors.extend({'user_pin': user_pin, 'error': str(e)} for _, user_pin in accounts)
+        return
+    for (_, user_pin), error in zip(accounts, panel_group.account_errors(panel_results, len(accounts))):
+        if error is not None:
+            report.sync_errors.append({'user_pin': user_pin, 'error': error})
+        else:
+            report.synced += 1
+
+def export_accounts(f, fmt: str = FORMAT_TXT, storage=None, status: str = 'active',
+                    essential: bool = False) -> ExportReport:
+    """流式导出账号，status为None时导出所有状态，essential为True时只导出pt_key和pt_pin"""
+    storage = storage or get_storage()
+    report = ExportReport()
+    start = time.perf_counter()
+    writer = None
+    if fmt == FORMAT_CSV:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, lineterminator='\n')
+        writer.writeheader()
+    for user_pin, cookie, row_status, updated_at in storage.iter_cookies(status=status):
+        if essential:
+            cookie = format_essential_cookies(parse_cookie_str(cookie))
+        if fmt == FORMAT_TXT:
+            f.write(cookie + '\n')
+        else:
+            row = {'user_pin': user_pin, 'cookie': cookie, 'status': row_status, 'updated_at': updated_at}
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+        report.exported += 1
+    report.elapsed = time.perf_counter() - start
+    return report
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtWebEngineCore import QWebEngineProfile
+from core.cookie_manager import CookieManager
+from core.web_view_manager import WebViewManager, LOW_MEMORY_OFF, LOW_MEMORY_TEARDOWN
+
+# 检测到登录后等待一段时间再释放页面，让登录后的跳转和Cookie写入完成（毫秒）
+RELEASE_DELAY_MS = 5000
+
+class AccountSession(QObject):
+    """单个京东账号的登录会话
+
+    每个会话拥有自己的Profile、WebView和CookieManager，
+    多个账号可以同时登录，并各自保存和同步Cookie。
+    开启低内存模式后，每次登录完成并保存Cookie后释放页面，需要时再重新加载
+    """
+    name_changed = pyqtSignal(str)
+
+    def __init__(self, profile: QWebEngineProfile = None, load_saved: bool = False, request_interceptor=None,
+                 low_memory: str = LOW_MEMORY_OFF, parent=None):
+        super().__init__(parent)
+        self.low_memory = low_memory
+        # 每次从未登录变为已登录时只释放一次页面，用户手动刷新后不再自动释放
+        self._release_armed = True
+        # 未指定Profile时创建无痕Profile，Cookie只保存在内存中，不与其他账号共享
+        self.owns_profile = profile is None
+        self.profile = QWebEngineProfile(self) if profile is None else profile
+        # 拦截器必须在页面创建前安装，多个会话可以共用同一个拦截器
+        if request_interceptor is not None:
+            self.profile.setUrlRequestInterceptor(request_interceptor)
+        self.web_view_manager = WebViewManager(self.profile, filtered=request_interceptor is not None)
+        self.cookie_manager = CookieManager(self.web_view_manager.get_web_view(), self.profile, load_saved)
+        self._account_name = self.account_name()
+        self.cookie_manager.cookies_updated.connect(self._on_cookies_updated)
+
+    def get_web_view(self):
+        return self.web_view_manager.get_web_view()
+
+    def account_name(self) -> str:
+        """账号名称，登录前为“未登录”"""
+        return self.cookie_manager.cookies.get('pt_pin') or '未登录'
+
+    def _on_cookies_updated(self, cookie_str):
+        name = self.account_name()
+        if name != self._account_name:
+            self._account_name = name
+            self.name_changed.emit(name)
+        if not self.low_memory:
+            return
+        if not self.cookie_manager.is_logged_in:
+            self._release_armed = True
+        elif self._release_armed:
+            self._release_armed = False
+            QTimer.singleShot(RELEASE_DELAY_MS, self._release_page)
+
+    def _release_page(self):
+        if not self.cookie_manager.is_logged_in:
+            return
+        # 确保最新的Cookie已写入数据库
+        self.cookie_manager.flush()
+        self.web_view_manager.suspend(teardown=self.low_memory == LOW_MEMORY_TEARDOWN)
+
+    def close(self):
+        """保存尚未写入的Cookie并释放WebView和Profile"""
+        self.cookie_manager.shutdown()
+        # 页面必须先于Profile释放
+        self.get_web_view().deleteLater()
+        if self.owns_profile:
+            self.profile.deleteLater()
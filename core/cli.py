@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""无界面命令行模式
+
+直接使用数据库中保存的Cookie和青龙面板配置，不加载PyQt6，适合在服务器上由cron调用：
+
+    python -m core sync --all
+    python -m core sync --pin jd_user1 jd_user2
+    python -m core sync --all --panel http://localhost:5700
+    python -m core check --disable-envs
+    python -m core accounts
+    python -m core maintain --keep 5
+    python -m core daemon
+    python -m core import accounts.txt --sync
+    python -m core export accounts.csv
+    python -m core ctl sync --all
+
+结果以JSON输出到标准输出，退出码：0 全部成功，1 部分失败，2 配置或参数错误。
+设置 JD_HELPER_METRICS_LOG 或 JD_HELPER_METRICS_PROM 环境变量可输出请求耗时等指标
+"""
+
+import argparse
+import json
+import sys
+import time
+from database.storage import get_storage
+from core.cookie_utils import parse_cookie_str, format_essential_cookies
+from core.instrumentation import instrumentation
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+
+def _print_json(data):
+    json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+
+def cmd_accounts(args):
+    """列出数据库中保存的账号，--expiring只列出指定小时内过期的有效账号"""
+    storage = get_storage()
+    if args.expiring is not None:
+        _print_json([
+            {'user_pin': user_pin, 'expires_at': expires_at}
+            for user_pin, expires_at in storage.accounts_expiring_within(args.expiring * 3600)
+        ])
+        return EXIT_OK
+    expiries = storage.load_cookie_expiries(status=None)
+    rows = storage.load_cookies(status=None)
+    _print_json([
+        {'user_pin': user_pin, 'status': status, 'updated_at': updated_at, 'expires_at': expiries.get(user_pin)}
+        for user_pin, cookie, status, updated_at in rows
+    ])
+    return EXIT_OK
+
+def cmd_sync(args):
+    """将保存的Cookie批量同步到所有（或指定的）青龙面板"""
+    from core.qinglong_panel import QinglongPanel
+    from core.panel_group import PanelGroup
+
+    start = time.perf_counter()
+    rows = get_storage().load_cookies(user_pins=None if args.all else args.pin)
+    panels = [
+        panel for panel in QinglongPanel.load_all(read_timeout=args.timeout)
+        if not args.panel or panel.panel_url in args.panel
+    ]
+    if not panels:
+        _print_json({'error': '请先配置青龙面板信息'})
+        return EXIT_ERROR
+    
+    accounts = []
+    for user_pin, cookie, status, updated_at in rows:
+        accounts.append((format_essential_cookies(parse_cookie_str(cookie)), user_pin))
+    panel_results = PanelGroup(panels, max_workers=args.workers).sync_cookies(accounts) if accounts else []
+    
+    failed = [panel_result for panel_result in panel_results if not panel_result.success]
+    missing = sorted(set(args.pin or []) - {user_pin for user_pin, *_ in rows})
+    _print_json({
+        'accounts': len(accounts),
+        'panels': len(panels),
+        'failed_panels': len(failed),
+        'missing': missing,
+        'elapsed': round(time.perf_counter() - start, 3),
+        'results': [
+            dict(
+                panel_result.__dict__,
+                elapsed=round(panel_result.elapsed, 3),
+                results=[result.__dict__ for result in panel_result.results]
+            )
+            for panel_result in panel_results
+        ],
+    })
+    return EXIT_FAILED if failed or missing else EXIT_OK
+
+def cmd_check(args):
+    """检测保存的Cookie是否有效，失效账号标记为expired"""
+    from core.cookie_checker import CookieChecker
+    from core.panel_group import PanelGroup
+
+    start = time.perf_counter()
+    checker = CookieChecker(check_url=args.url, max_workers=args.workers, rate=args.rate, timeout=args.timeout)
+    panel_group = PanelGroup() if args.disable_envs else None
+    results = checker.check_stored(user_pins=args.pin, panel_group=panel_group)
+    
+    expired = [result.user_pin for result in results if result.alive is False]
+    unknown = [result for result in results if result.alive is None]
+    _print_json({
+        'total': len(results),
+        'alive': len(results) - len(expired) - len(unknown),
+        'expired': expired,
+        'unknown': [result.__dict__ for result in unknown],
+        'elapsed': round(time.perf_counter() - start, 3),
+    })
+    return EXIT_FAILED if expired or unknown else EXIT_OK
+
+def cmd_maintain(args):
+    """压缩Cookie历史版本，到期时执行VACUUM和ANALYZE"""
+    from database.retention import CookieRetention
+
+    retention = CookieRetention(keep_versions=args.keep, archive=not args.drop)
+    _print_json(retention.run(force=args.force).as_dict())
+    return EXIT_OK
+
+def cmd_daemon(args):
+    """常驻运行，按Cookie预计过期时间定期检测和同步账号，每一轮输出一行JSON"""
+    import signal
+    import threading
+    from core.panel_group import PanelGroup
+    from core.refresh_scheduler import RefreshScheduler
+
+    scheduler = RefreshScheduler(
+        panel_group=PanelGroup(max_workers=args.workers),
+        check_interval=args.check_interval * 3600,
+        jitter=args.jitter * 60,
+        max_concurrency=args.concurrency,
+        max_batch=args.batch,
+        disable_envs=args.disable_envs
+    )
+    if args.once:
+        _print_json(scheduler.run_due().as_dict())
+        scheduler.close()
+        return EXIT_OK
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+
+    def on_tick(result):
+        sys.stdout.write(json.dumps(dict(result.as_dict(), time=round(time.time())), ensure_ascii=False) + '\n')
+        sys.stdout.flush()
+
+    try:
+        scheduler.run_forever(stop_event, on_tick)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.close()
+    return EXIT_OK
+
+def _open_file(path: str, mode: str):
+    """打开文件，-表示标准输入或标准输出"""
+    if path == '-':
+        return open(sys.stdin.fileno() if 'r' in mode else sys.stdout.fileno(), mode,
+                    encoding='utf-8', newline='', closefd=False)
+    return open(path, mode, encoding='utf-8-sig' if 'r' in mode else 'utf-8', newline='')
+
+def cmd_import(args):
+    """从文件流式导入账号，可同时批量同步到青龙面板"""
+    from core.account_io import import_accounts, detect_format
+
+    panel_group = None
+    if args.sync:
+        from core.panel_group import PanelGroup
+        panel_group = PanelGroup(max_workers=args.workers)
+        if not panel_group.panels():
+            _print_json({'error': '请先配置青龙面板信息'})
+            return EXIT_ERROR
+    fmt = args.format or detect_format(args.file)
+    with _open_file(args.file, 'r') as f:
+        report = import_accounts(f, fmt, chunk_size=args.chunk, panel_group=panel_group)
+    _print_json(report.as_dict())
+    return EXIT_FAILED if report.errors or report.sync_errors else EXIT_OK
+
+def cmd_export(args):
+    """将保存的账号流式导出到文件，导出到标准输出时结果写入标准错误"""
+    from core.account_io import export_accounts, detect_format
+
+    fmt = args.format or detect_format(args.file)
+    with _open_file(args.file, 'w') as f:
+        report = export_accounts(f, fmt, status=None if args.all_status else 'active', essential=args.essential)
+    if args.file == '-':
+        sys.stderr.write(json.dumps(report.as_dict(), ensure_ascii=False) + '\n')
+    else:
+        _print_json(report.as_dict())
+    return EXIT_OK
+
+def cmd_ctl(args):
+    """通过本机控制接口让运行中的图形界面执行命令，复用已登录的会话和面板连接"""
+    from core.control_api import send_request
+
+    command_args = {}
+    if args.action == 'sync':
+        command_args['all'] = args.all
+    elif args.action == 'envs':
+        command_args.update(panel=args.panel, search=args.search)
+    elif args.action == 'cookie_status':
+        command_args['include_cookie'] = args.include_cookie
+    start = time.perf_counter()
+    result = send_request(args.action, command_args, timeout=int(args.timeout * 1000))
+    if result is None:
+        _print_json({'error': '图形界面未运行'})
+        return EXIT_ERROR
+    _print_json({'result': result, 'elapsed': round(time.perf_counter() - start, 3)})
+    if args.action == 'sync' and not all(panel_result['success'] for panel_result in result):
+        return EXIT_FAILED
+    return EXIT_OK
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m core', description='JD Cookie 助手命令行模式')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    sync_parser = subparsers.add_parser('sync', help='同步保存的Cookie到青龙面板')
+    target = sync_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--all', action='store_true', help='同步所有有效账号')
+    target.add_argument('--pin', nargs='+', help='同步指定pt_pin的账号')
+    sync_parser.add_argument('--panel', nargs='+', help='只同步到指定地址的面板，默认同步到所有面板')
+    sync_parser.add_argument('--workers', type=int, default=4, help='同时同步的面板数量上限')
+    sync_parser.add_argument('--timeout', type=float, default=15, help='读取超时（秒）')
+    sync_parser.set_defaults(func=cmd_sync)
+
+    from core.cookie_checker import DEFAULT_CHECK_URL, DEFAULT_MAX_WORKERS, DEFAULT_RATE, DEFAULT_TIMEOUT
+    check_parser = subparsers.add_parser('check', help='检测保存的Cookie是否有效')
+    check_parser.add_argument('--pin', nargs='+', help='只检测指定pt_pin的账号')
+    check_parser.add_argument('--disable-envs', action='store_true', help='同时禁用面板上失效账号的JD_COOKIE变量')
+    check_parser.add_argument('--url', default=DEFAULT_CHECK_URL, help='检测接口地址')
+    check_parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS, help='并发检测数')
+    check_parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='每秒最多检测请求数')
+    check_parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='请求超时（秒）')
+    check_parser.set_defaults(func=cmd_check)
+
+    accounts_parser = subparsers.add_parser('accounts', help='列出保存的账号')
+    accounts_parser.add_argument('--expiring', type=float, metavar='HOURS', help='只列出指定小时内过期的账号')
+    accounts_parser.set_defaults(func=cmd_accounts)
+
+    from database.retention import DEFAULT_KEEP_VERSIONS
+    maintain_parser = subparsers.add_parser('maintain', help='清理Cookie历史版本并整理数据库')
+    maintain_parser.add_argument('--keep', type=int, default=DEFAULT_KEEP_VERSIONS, help='每个账号保留的历史版本数')
+    maintain_parser.add_argument('--drop', action='store_true', help='直接删除更早的版本，不压缩归档')
+    maintain_parser.add_argument('--force', action='store_true', help='立即执行VACUUM和ANALYZE')
+    maintain_parser.set_defaults(func=cmd_maintain)
+
+    from core.refresh_scheduler import DEFAULT_CHECK_INTERVAL, DEFAULT_JITTER, DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_BATCH
+    daemon_parser = subparsers.add_parser('daemon', help='常驻运行，定期检测Cookie并同步到青龙面板')
+    daemon_parser.add_argument('--once', action='store_true', help='只处理一轮到期的账号后退出')
+    daemon_parser.add_argument('--check-interval', type=float, default=DEFAULT_CHECK_INTERVAL / 3600, help='检测间隔（小时）')
+    daemon_parser.add_argument('--jitter', type=float, default=DEFAULT_JITTER / 60, help='账号之间错开的最大时间（分钟）')
+    daemon_parser.add_argument('--concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY, help='同时检测的账号数')
+    daemon_parser.add_argument('--batch', type=int, default=DEFAULT_MAX_BATCH, help='每轮最多处理的账号数')
+    daemon_parser.add_argument('--workers', type=int, default=4, help='同时同步的面板数量上限')
+    daemon_parser.add_argument('--disable-envs', action='store_true', help='同时禁用面板上失效账号的JD_COOKIE变量')
+    daemon_parser.set_defaults(func=cmd_daemon)
+
+    from core.account_io import FORMATS, DEFAULT_CHUNK_SIZE
+    import_parser = subparsers.add_parser('import', help='从文件导入账号')
+    import_parser.add_argument('file', help='txt（每行一个Cookie）、jsonl或csv文件，-表示标准输入')
+    import_parser.add_argument('--format', choices=FORMATS, help='文件格式，默认按扩展名识别')
+    import_parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SIZE, help='每个事务写入的账号数')
+    import_parser.add_argument('--sync', action='store_true', help='导入后同步到所有青龙面板')
+    import_parser.add_argument('--workers', type=int, default=4, help='同时同步的面板数量上限')
+    import_parser.set_defaults(func=cmd_import)
+
+    export_parser = subparsers.add_parser('export', help='导出保存的账号到文件')
+    export_parser.add_argument('file', help='txt、jsonl或csv文件，-表示标准输出')
+    export_parser.add_argument('--format', choices=FORMATS, help='文件格式，默认按扩展名识别')
+    export_parser.add_argument('--all-status', action='store_true', help='同时导出已失效的账号')
+    export_parser.add_argument('--essential', action='store_true', help='只导出pt_key和pt_pin')
+    export_parser.set_defaults(func=cmd_export)
+
+    ctl_parser = subparsers.add_parser('ctl', help='控制运行中的图形界面')
+    ctl_parser.add_argument('action', choices=['activate', 'sync', 'envs', 'cookie_status'], help='要执行的命令')
+    ctl_parser.add_argument('--all', action='store_true', help='sync：同步所有已登录账号，默认只同步当前账号')
+    ctl_parser.add_argument('--panel', help='envs：面板地址，默认为界面中选中的面板')
+    ctl_parser.add_argument('--search', help='envs：按名称、值和备注筛选')
+    ctl_parser.add_argument('--include-cookie', action='store_true', help='cookie_status：同时输出Cookie')
+    ctl_parser.add_argument('--timeout', type=float, default=60, help='等待响应的超时（秒）')
+    ctl_parser.set_defaults(func=cmd_ctl)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    instrumentation.configure_from_env()
+    try:
+        return args.func(args)
+    except Exception as e:
+        _print_json({'error': str(e)})
+        return EXIT_ERROR
+    finally:
+        # 写出最终的指标
+        instrumentation.close()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""本机控制接口
+
+图形界面启动后在本地套接字上监听，每个请求和响应都是一行JSON：
+
+    {"id": 1, "command": "sync", "args": {"all": true}}
+    {"id": 1, "ok": true, "result": ...}
+    {"id": 1, "ok": false, "error": "..."}
+
+套接字只允许当前用户访问，名称由数据目录决定，同一数据目录只能运行一个实例。
+只依赖QtNetwork，命令行客户端不需要加载界面和WebEngine
+"""
+
+import json
+import os
+import zlib
+from PyQt6.QtCore import QObject
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+from database.storage import get_data_dir
+
+# 客户端连接和等待响应的超时（毫秒）
+DEFAULT_CONNECT_TIMEOUT_MS = 1000
+DEFAULT_REPLY_TIMEOUT_MS = 60 * 1000
+# 单个请求的最大长度，防止异常客户端占用内存
+MAX_REQUEST_BYTES = 1024 * 1024
+
+def get_server_name() -> str:
+    """本地套接字名称，不同数据目录的实例互不影响"""
+    data_dir = os.path.abspath(get_data_dir())
+    return f'jd_helper-{zlib.crc32(data_dir.encode("utf-8")):08x}'
+
+def send_request(command: str, args: dict = None, server_name: str = None,
+                 connect_timeout: int = DEFAULT_CONNECT_TIMEOUT_MS, timeout: int = DEFAULT_REPLY_TIMEOUT_MS):
+    """向运行中的实例发送一个命令并等待结果，没有运行中的实例时返回None，命令失败时抛出异常"""
+    socket = QLocalSocket()
+    socket.connectToServer(server_name or get_server_name())
+    if not socket.waitForConnected(connect_timeout):
+        return None
+    try:
+        request = {'id': 1, 'command': command, 'args': args or {}}
+        socket.write(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+        socket.waitForBytesWritten(connect_timeout)
+        buffer = b''
+        while b'\n' not in buffer:
+            if not socket.waitForReadyRead(timeout):
+                raise Exception('等待运行中的实例响应超时')
+            buffer += bytes(socket.readAll())
+        response = json.loads(buffer.split(b'\n', 1)[0])
+    finally:
+        socket.disconnectFromServer()
+    if not response.get('ok'):
+        raise Exception(response.get('error') or '命令执行失败')
+    return response.get('result')
+
+class ControlServer(QObject):
+    """在本地套接字上接收命令并调用对应的处理函数
+
+    处理函数的签名为handler(args, reply)，完成后调用reply(result)或reply(error=错误信息)，
+    可以在后台任务结束后再调用，但必须在主线程中调用
+    """
+
+    def __init__(self, handlers: dict, server_name: str = None, parent=None):
+        super().__init__(parent)
+        self.handlers = handlers
+        self.server_name = server_name or get_server_name()
+        self.server = QLocalServer(self)
+        # 只允许当前用户连接
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self._on_new_connection)
+        self._buffers = {}
+
+    def listen(self) -> bool:
+        """开始监听，已有实例在运行时返回False；上次异常退出留下的套接字会被清理"""
+        # 设置了访问权限时listen会直接替换已有的套接字文件，必须先确认没有实例在运行
+        if send_request('ping', server_name=self.server_name) is not None:
+            return False
+        QLocalServer.removeServer(self.server_name)
+        return self.server.listen(self.server_name)
+
+    def close(self):
+        self.server.close()
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self._buffers[socket] = b''
+            socket.readyRead.connect(lambda socket=socket: self._on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self._on_disconnected(socket))
+
+    def _on_disconnected(self, socket):
+        self._buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def _on_ready_read(self, socket):
+        buffer = self._buffers.get(socket, b'') + bytes(socket.readAll())
+        if len(buffer) > MAX_REQUEST_BYTES:
+            socket.abort()
+            return
+        *lines, self._buffers[socket] = buffer.split(b'\n')
+        for line in lines:
+            if line.strip():
+                self._dispatch(socket, line)
+
+    def _dispatch(self, socket, line: bytes):
+        request_id = None
+
+        def reply(result=None, error: str = None):
+            if socket not in self._buffers:
+                # 客户端已断开
+                return
+            response = {'id': request_id, 'ok': error is None}
+            if error is None:
+                response['result'] = result
+            else:
+                response['error'] = error
+            socket.write(json.dumps(response, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+            socket.flush()
+
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            command = request.get('command')
+            if command == 'ping':
+                reply('pong')
+                return
+            handler = self.handlers.get(command)
+            if handler is None:
+                raise Exception(f'未知的命令: {command}')
+            handler(request.get('args') or {}, reply)
+        except Exception as e:
+            reply(error=str(e))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from requests.adapters import HTTPAdapter
+from database.storage import get_storage
+from core.cookie_utils import parse_cookie_str, format_cookie_header
+from core.rate_limiter import TokenBucket
+
+# 京东账号信息接口，Cookie失效时retcode为1001
+DEFAULT_CHECK_URL = 'https://me-api.jd.com/user_new/info/GetJDUserInfoUnion'
+DEFAULT_MAX_WORKERS = 8
+# 每秒最多发起的检测请求数
+DEFAULT_RATE = 5
+DEFAULT_TIMEOUT = 10
+
+USER_AGENT = 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148'
+
+@dataclass
+class CheckResult:
+    """单个账号的检测结果，alive为None表示检测失败、状态未知"""
+    user_pin: str
+    alive: bool = None
+    error: str = ''
+
+class CookieChecker:
+    """Cookie有效性检测
+
+    通过有限的线程池并发请求检测接口，所有线程共享一个令牌桶限流，
+    检测完成后批量更新jd_cookie.status
+    """
+
+    def __init__(self, check_url: str = DEFAULT_CHECK_URL, max_workers: int = DEFAULT_MAX_WORKERS,
+                 rate: float = DEFAULT_RATE, timeout: float = DEFAULT_TIMEOUT):
+        self.check_url = check_url
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.rate_limiter = TokenBucket(rate)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Referer': 'https://home.m.jd.com/',
+        })
+
+    def check_cookie(self, cookie_str: str) -> bool:
+        """检测单个Cookie是否有效，无法判断时抛出异常"""
+        self.rate_limiter.acquire()
+        response = self.session.get(
+            self.check_url,
+            headers={'Cookie': format_cookie_header(parse_cookie_str(cookie_str))},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise Exception(f"检测接口返回异常: HTTP {response.status_code}")
+        retcode = str(response.json().get('retcode'))
+        if retcode == '0':
+            return True
+        if retcode == '1001':
+            return False
+        raise Exception(f"检测接口返回未知结果: retcode={retcode}")
+
+    def check_all(self, accounts: list, cancel_event: threading.Event = None) -> list:
+        """并发检测多个账号，accounts为(user_pin, cookie_str)列表"""
+        def check(account):
+            user_pin, cookie_str = account
+            if cancel_event is not None and cancel_event.is_set():
+                return CheckResult(user_pin, error='检测已取消')
+            try:
+                return CheckResult(user_pin, self.check_cookie(cookie_str))
+            except Exception as e:
+                return CheckResult(user_pin, error=str(e))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(check, accounts))
+
+    def check_stored(self, user_pins: list = None, panel_group=None, cancel_event: threading.Event = None) -> list:
+        """检测数据库中的有效账号，将失效账号标记为expired
+
+        指定panel_group时，同时禁用各面板上失效账号对应的JD_COOKIE变量
+        """
+        storage = get_storage()
+        rows = storage.load_cookies(user_pins=user_pins)
+        results = self.check_all([(user_pin, cookie) for user_pin, cookie, *_ in rows], cancel_event)
+        checked = [result.user_pin for result in results if result.alive is not None]
+        if checked:
+            storage.mark_cookies_checked(checked)
+        expired = [result.user_pin for result in results if result.alive is False]
+        if expired:
+            storage.update_cookie_statuses([('expired', user_pin) for user_pin in expired])
+            if panel_group is not None and panel_group.panels():
+                for panel_result in panel_group.disable_accounts(expired):
+                    if not panel_result.success:
+                        print(f"禁用失效账号失败: {panel_result.panel_url}: {panel_result.error}")
+        return results
+
+    def close(self):
+        self.session.close()
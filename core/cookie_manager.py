@@ -1,26 +1,58 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtCore import QObject, QTimer, QDateTime, pyqtSignal
 from PyQt6.QtWebEngineCore import QWebEngineProfile
 from PyQt6.QtNetwork import QNetworkCookie
-from database.models import init_db
+from database.storage import get_storage, DEFAULT_COOKIE_DOMAIN, DEFAULT_COOKIE_PATH
+from core.cookie_utils import parse_cookie_str, format_cookie_str, format_essential_cookies
+from core.instrumentation import instrumentation
+from core.web_profile import has_persistent_cookies
 from urllib.parse import unquote
 
+# 合并Cookie变更的时间窗口（毫秒），窗口内的多次变更只刷新一次界面和数据库
+FLUSH_INTERVAL_MS = 300
+# 旧数据只有Cookie字符串，没有域名和过期时间
+DEFAULT_COOKIE_ATTRS = (DEFAULT_COOKIE_DOMAIN, DEFAULT_COOKIE_PATH, None)
+
 class CookieManager(QObject):
     cookies_updated = pyqtSignal(str)
     
-    def __init__(self, web_view):
+    def __init__(self, web_view, profile=None, load_saved=True):
         super().__init__()
         self.web_view = web_view
-        self.cookie_store = QWebEngineProfile.defaultProfile().cookieStore()
+        self.profile = profile or QWebEngineProfile.defaultProfile()
+        self.cookie_store = self.profile.cookieStore()
         self.cookie_store.cookieAdded.connect(self.on_cookie_added)
         self.cookies = {}
+        # 每个Cookie的(域名, 路径, 过期时间)，与cookies中的值一起写入jd_cookie_item
+        self.cookie_attrs = {}
         self.is_logged_in = False
-        self.conn = init_db()
-        self.load_saved_cookies()
+        # 渲染好的Cookie字符串，只在Cookie的值变化时重新生成
+        self._rendered = {}
+        # 尚未写入数据库的Cookie名称
+        self._unsaved = set()
+        # 已经写入完整Cookie项的账号，登录其他账号后需要重新写入全部Cookie项
+        self._saved_pin = None
+        # 登录时会连续写入几十个Cookie，先缓冲再统一刷新
+        self._dirty = False
+        self._pending_changes = 0
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush)
+        self.storage = get_storage()
+        if load_saved:
+            self.load_saved_cookies()
         self.web_view.urlChanged.connect(self.check_login_status)
     
+    @property
+    def cookie_str(self) -> str:
+        """name=value; 形式的完整Cookie字符串"""
+        if 'full' not in self._rendered:
+            self._rendered['full'] = format_cookie_str(self.cookies)
+        return self._rendered['full']
+    
     def check_login_status(self, url):
         # 检查是否存在pt_key和pt_pin这两个关键Cookie
         if 'pt_key' in self.cookies and 'pt_pin' in self.cookies:
@@ -30,71 +62,121 @@ class CookieManager(QObject):
     
     def clear_cookies(self):
         self.cookies = {}
+        self.cookie_attrs = {}
+        self._rendered.clear()
+        self._unsaved.clear()
+        self._saved_pin = None
+        self._flush_timer.stop()
         self.update_cookie_text()
         # 清除数据库中保存的Cookie
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM jd_cookie WHERE status = 'active'")
-        self.conn.commit()
+        self.storage.delete_active_cookies()
     
     def on_cookie_added(self, cookie):
         domain = cookie.domain()
-        if '.jd.com' in domain:
-            name = cookie.name().data().decode()
-            value = cookie.value().data().decode()
-            # 对Cookie值进行URL解码
-            if name == 'pt_pin':
-                value = unquote(value)
+        if '.jd.com' not in domain:
+            instrumentation.count('cookie_event', event='added', domain='other')
+            return
+        name = cookie.name().data().decode()
+        value = cookie.value().data().decode()
+        # 对Cookie值进行URL解码
+        if name == 'pt_pin':
+            value = unquote(value)
+        expires_at = None if cookie.isSessionCookie() else float(cookie.expirationDate().toSecsSinceEpoch())
+        attrs = (domain, cookie.path() or '/', expires_at)
+        if self.cookies.get(name) == value and self.cookie_attrs.get(name) == attrs:
+            # 页面经常重复写入相同的Cookie，无需刷新
+            instrumentation.count('cookie_event', event='unchanged', domain='jd')
+            return
+        instrumentation.count('cookie_event', event='added', domain='jd')
+        if self.cookies.get(name) != value:
             self.cookies[name] = value
+            self._rendered.clear()
+        self.cookie_attrs[name] = attrs
+        self._unsaved.add(name)
+        self.check_login_status(None)
+        self.schedule_flush()
+    
+    def schedule_flush(self):
+        """标记Cookie已变更，在合并窗口结束时统一刷新"""
+        self._dirty = True
+        self._pending_changes += 1
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+    
+    def flush(self):
+        """立即刷新缓冲中的Cookie变更"""
+        self._flush_timer.stop()
+        if self._dirty:
             self.update_cookie_text()
-            self.check_login_status(None)
     
     def update_cookie_text(self):
-        cookie_str = ''
-        for name, value in self.cookies.items():
-            cookie_str += f"{name}={value}; "
-        self.cookies_updated.emit(cookie_str)
-        
-        # 如果已登录，保存Cookie到数据库
-        if self.is_logged_in and 'pt_pin' in self.cookies:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "INSERT OR REPLACE INTO jd_cookie (user_pin, cookie, status) VALUES (?, ?, ?)",
-                (self.cookies['pt_pin'], cookie_str, 'active')
-            )
-            self.conn.commit()
+        self._dirty = False
+        # 一次刷新合并的Cookie变更数
+        instrumentation.count('cookie_flush_batch', self._pending_changes)
+        self._pending_changes = 0
+        with instrumentation.timer('cookie_flush'):
+            cookie_str = self.cookie_str
+            self.cookies_updated.emit(cookie_str)
+            
+            # 如果已登录，保存Cookie到数据库，只写入变化过的Cookie项；
+            # 账号第一次保存时写入全部Cookie项，否则恢复时只能得到部分Cookie
+            if self.is_logged_in and 'pt_pin' in self.cookies:
+                user_pin = self.cookies['pt_pin']
+                names = self._unsaved if user_pin == self._saved_pin else self.cookies
+                items = [
+                    (name, self.cookies[name], *self.cookie_attrs.get(name, DEFAULT_COOKIE_ATTRS))
+                    for name in names if name in self.cookies
+                ]
+                self.storage.save_account_cookies(user_pin, cookie_str, items)
+                self._unsaved.clear()
+                self._saved_pin = user_pin
     
     def load_saved_cookies(self):
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT cookie FROM jd_cookie WHERE status = 'active' LIMIT 1")
-            result = cursor.fetchone()
+            # 持久化Profile中已有Cookie时由CookieStore自行恢复；
+            # 最近更新的账号可能是其他标签页登录的，不能先用它填充，否则会与Profile中账号的Cookie混在一起保存
+            restore_from_store = has_persistent_cookies(self.profile)
+            account = None if restore_from_store else self.storage.load_active_account()
             
-            if result:
-                cookie_str = result[0]
-                for cookie_item in cookie_str.split('; '):
-                    if '=' in cookie_item:
-                        name, value = cookie_item.split('=', 1)
-                        # 对pt_pin进行URL解码
-                        if name == 'pt_pin':
-                            value = unquote(value)
-                        self.cookies[name] = value
-                        # 将Cookie添加到WebView的CookieStore中
-                        cookie = QNetworkCookie(name.encode(), value.encode())
-                        cookie.setDomain('.jd.com')
-                        cookie.setPath('/')
-                        self.cookie_store.setCookie(cookie)
+            if account:
+                user_pin, cookie_str = account
+                # 优先使用逐项保存的Cookie，旧数据才解析Cookie字符串
+                items = self.storage.load_cookie_items(user_pin)
+                if items:
+                    self._saved_pin = user_pin
+                else:
+                    items = [(name, value, *DEFAULT_COOKIE_ATTRS) for name, value in parse_cookie_str(cookie_str).items()]
+                for name, value, domain, path, expires_at in items:
+                    self.cookies[name] = value
+                    self.cookie_attrs[name] = (domain, path, expires_at)
+                    # 将Cookie添加到WebView的CookieStore中
+                    cookie = QNetworkCookie(name.encode(), value.encode())
+                    cookie.setDomain(domain)
+                    cookie.setPath(path)
+                    if expires_at:
+                        cookie.setExpirationDate(QDateTime.fromSecsSinceEpoch(int(expires_at)))
+                    self.cookie_store.setCookie(cookie)
+                self._rendered.clear()
                 self.update_cookie_text()
                 self.check_login_status(None)
+            if restore_from_store:
+                # 持久化的Cookie通过cookieAdded逐个送达，与登录时的处理相同
+                self.cookie_store.loadAllCookies()
+            instrumentation.count('cookie_restore', source='store' if restore_from_store else 'database')
         except Exception as e:
             print(f"加载Cookie失败: {str(e)}")
             
-    def __del__(self):
-        if hasattr(self, 'conn') and self.conn:
-            self.conn.close()
+    def shutdown(self):
+        """退出前写入尚未刷新的Cookie"""
+        self.flush()
     
     def get_formatted_cookie(self):
-        return '; '.join([f"{name}={value}" for name, value in self.cookies.items()])+';'
+        if 'formatted' not in self._rendered:
+            self._rendered['formatted'] = '; '.join([f"{name}={value}" for name, value in self.cookies.items()])+';'
+        return self._rendered['formatted']
     
     def get_essential_cookies(self):
         """获取必要的Cookie（仅pt_key和pt_pin）"""
-        return '; '.join([f"{name}={value}" for name, value in self.cookies.items() if name in ['pt_key', 'pt_pin']])+';'
\ No newline at end of file
+        if 'essential' not in self._rendered:
+            self._rendered['essential'] = format_essential_cookies(self.cookies)
+        return self._rendered['essential']
@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from urllib.parse import quote, unquote
+
+# 同步到青龙面板所需的Cookie
+ESSENTIAL_COOKIES = ('pt_key', 'pt_pin')
+
+def parse_cookie_str(cookie_str: str) -> dict:
+    """将 name=value; 形式的Cookie字符串解析为字典，pt_pin会进行URL解码"""
+    cookies = {}
+    for cookie_item in cookie_str.split(';'):
+        cookie_item = cookie_item.strip()
+        if '=' in cookie_item:
+            name, value = cookie_item.split('=', 1)
+            if name == 'pt_pin':
+                value = unquote(value)
+            cookies[name] = value
+    return cookies
+
+def format_cookie_str(cookies: dict) -> str:
+    """生成 name=value; 形式的完整Cookie字符串，pt_pin保持解码后的形式，与登录时保存的格式一致"""
+    return ''.join(f"{name}={value}; " for name, value in cookies.items())
+
+def format_essential_cookies(cookies: dict) -> str:
+    """生成只包含pt_key和pt_pin的Cookie字符串，两者都没有时返回空字符串"""
+    items = [f"{name}={value}" for name, value in cookies.items() if name in ESSENTIAL_COOKIES]
+    return '; '.join(items)+';' if items else ''
+
+def format_cookie_header(cookies: dict) -> str:
+    """生成HTTP请求头使用的pt_key和pt_pin，pt_pin重新URL编码，中文账号名也只包含ASCII字符"""
+    items = [
+        f"{name}={quote(value) if name == 'pt_pin' else value}"
+        for name, value in cookies.items() if name in ESSENTIAL_COOKIES
+    ]
+    return '; '.join(items)+';' if items else ''
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+# 镜像默认有效期（秒）
+DEFAULT_MIRROR_TTL = 300
+
+class EnvRecord:
+    """紧凑的环境变量记录
+
+    只保留程序用到的字段，使用__slots__避免每条记录一个dict；
+    支持env['id']、env.get('status')和dict(env)，可替代面板返回的dict使用
+    """
+
+    FIELDS = ('id', 'name', 'value', 'remarks', 'status', 'updatedAt')
+    __slots__ = FIELDS
+
+    def __init__(self, id=None, name='', value='', remarks='', status=0, updatedAt=None):
+        self.id = id
+        self.name = name
+        self.value = value
+        self.remarks = remarks
+        self.status = status
+        self.updatedAt = updatedAt
+
+    @classmethod
+    def from_dict(cls, env: dict):
+        """从面板返回的dict创建记录，忽略其他字段"""
+        record = cls()
+        record.update(env)
+        return record
+
+    def update(self, env):
+        for field in self.FIELDS:
+            if field in env:
+                setattr(self, field, env[field])
+
+    def copy(self):
+        record = EnvRecord.__new__(EnvRecord)
+        for field in self.FIELDS:
+            setattr(record, field, getattr(self, field))
+        return record
+
+    def keys(self):
+        return self.FIELDS
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str):
+        return key in self.FIELDS
+
+    def __eq__(self, other):
+        if isinstance(other, EnvRecord):
+            return all(getattr(self, field) == getattr(other, field) for field in self.FIELDS)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"EnvRecord(id={self.id!r}, name={self.name!r}, remarks={self.remarks!r}, status={self.status!r})"
+
+class EnvMirror:
+    """青龙面板环境变量的本地镜像
+
+    按(name, remarks)和id建立索引，超过有效期后需要重新拉取，
+    本程序自身的更新、创建、启用操作会直接修改镜像
+    """
+
+    def __init__(self, ttl: float = DEFAULT_MIRROR_TTL):
+        self.ttl = ttl
+        self._by_id = {}
+        self._by_key = {}
+        self._loaded_at = None
+        self._lock = threading.RLock()
+
+    def is_stale(self) -> bool:
+        """镜像是否需要重新拉取"""
+        with self._lock:
+            return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def invalidate(self):
+        """使镜像失效，下次使用时重新拉取"""
+        with self._lock:
+            self._loaded_at = None
+
+    def load(self, envs: list):
+        """用面板返回的完整列表替换镜像，envs可以是dict或EnvRecord"""
+        with self._lock:
+            self._by_id = {}
+            self._by_key = {}
+            for env in envs:
+                env = env.copy() if isinstance(env, EnvRecord) else EnvRecord.from_dict(env)
+                self._by_id[env.id] = env
+                # 同名同备注的变量只索引第一个，与面板列表顺序一致
+                self._by_key.setdefault((env.name, env.remarks), env)
+            self._loaded_at = time.monotonic()
+
+    def get(self, name: str, remarks: str):
+        """按名称和备注查找环境变量"""
+        with self._lock:
+            env = self._by_key.get((name, remarks))
+            return env.copy() if env else None
+
+    def get_by_id(self, env_id: int):
+        """按id查找环境变量"""
+        with self._lock:
+            env = self._by_id.get(env_id)
+            return env.copy() if env else None
+
+    def envs(self, name: str = None) -> list:
+        """获取镜像中的环境变量，可按名称过滤"""
+        with self._lock:
+            return [env.copy() for env in self._by_id.values() if name is None or env.name == name]
+
+    def upsert(self, env: dict):
+        """写入面板返回的单个环境变量，保留镜像中已有的字段"""
+        with self._lock:
+            current = self._by_id.get(env['id'])
+            if current is None:
+                current = self._by_id[env['id']] = EnvRecord()
+            else:
+                old_key = (current.name, current.remarks)
+                if self._by_key.get(old_key) is current:
+                    del self._by_key[old_key]
+            current.update(env)
+            self._by_key.setdefault((current.name, current.remarks), current)
+
+    def set_status(self, env_ids: list, status: int):
+        """修改环境变量的启用状态"""
+        with self._lock:
+            for env_id in env_ids:
+                env = self._by_id.get(env_id)
+                if env is not None:
+                    env.status = status
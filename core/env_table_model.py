@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+
+# 列定义：(字段, 表头)
+COLUMNS = [
+    ('remarks', '备注'),
+    ('status', '状态'),
+    ('updatedAt', '更新时间'),
+]
+
+# 状态筛选选项
+STATUS_ALL = None
+STATUS_ENABLED = 0
+STATUS_DISABLED = 1
+
+def _format_time(update_time):
+    """转换时间戳为可读格式"""
+    if not update_time:
+        return ''
+    try:
+        dt = datetime.fromisoformat(update_time.replace('Z', '+00:00'))
+    except ValueError:
+        return update_time
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+class EnvTableModel(QAbstractTableModel):
+    """JD_COOKIE环境变量表格模型
+
+    刷新时按id比较新旧列表，只插入、删除或更新发生变化的行，
+    视图的滚动位置和选中状态得以保留
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section][1]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        field = COLUMNS[index.column()][0]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if field == 'status':
+                return '已启用' if row['status'] == 0 else '已禁用'
+            if field == 'updatedAt':
+                return row['updated_text']
+            return row.get('remarks') or '无'
+        if role == Qt.ItemDataRole.UserRole:
+            # 排序使用原始值，ISO格式的时间可以直接按字符串比较
+            return row.get(field)
+        if role == Qt.ItemDataRole.ToolTipRole and field == 'remarks':
+            return row.get('value')
+        return None
+
+    def env_at(self, row: int) -> dict:
+        return self._rows[row]
+
+    def update_envs(self, envs: list):
+        """按id增量更新表格内容"""
+        new_envs = {env['id']: env for env in envs}
+
+        # 删除面板上已不存在的行，倒序删除保证行号有效
+        for row in range(len(self._rows) - 1, -1, -1):
+            if self._rows[row]['id'] not in new_envs:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._rows[row]
+                self.endRemoveRows()
+
+        # 更新发生变化的行，时间只在变化时重新解析
+        existing = set()
+        for row, current in enumerate(self._rows):
+            existing.add(current['id'])
+            env = new_envs[current['id']]
+            changed = [
+                column for column, (field, _) in enumerate(COLUMNS)
+                if env.get(field) != current.get(field)
+            ]
+            if env.get('value') != current.get('value'):
+                changed.append(0)
+            if changed:
+                self._rows[row] = self._make_row(env, current)
+                self.dataChanged.emit(self.index(row, min(changed)), self.index(row, max(changed)))
+
+        # 追加新增的行
+        added = [env for env_id, env in new_envs.items() if env_id not in existing]
+        if added:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            self._rows.extend(self._make_row(env) for env in added)
+            self.endInsertRows()
+
+    @staticmethod
+    def _make_row(env: dict, current: dict = None) -> dict:
+        row = dict(env)
+        if current is not None and current.get('updatedAt') == env.get('updatedAt'):
+            row['updated_text'] = current['updated_text']
+        else:
+            row['updated_text'] = _format_time(env.get('updatedAt'))
+        return row
+
+class EnvFilterProxyModel(QSortFilterProxyModel):
+    """按备注关键字和启用状态筛选环境变量"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.remarks_filter = ''
+        self.status_filter = STATUS_ALL
+        self.setSortRole(Qt.ItemDataRole.UserRole)
+
+    def set_remarks_filter(self, text: str):
+        self.remarks_filter = text.strip().lower()
+        self.invalidateFilter()
+
+    def set_status_filter(self, status):
+        self.status_filter = status
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        env = self.sourceModel().env_at(source_row)
+        if self.status_filter is not STATUS_ALL and env.get('status') != self.status_filter:
+            return False
+        if self.remarks_filter and self.remarks_filter not in (env.get('remarks') or '').lower():
+            return False
+        return True
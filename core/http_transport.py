@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from core.instrumentation import instrumentation
+
+# 默认超时时间（秒）
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 15
+# 每个面板保持的长连接数量
+DEFAULT_POOL_SIZE = 10
+
+class PanelTransport:
+    """青龙面板HTTP传输层
+
+    每个面板地址共用一个带连接池的Session，复用TCP/TLS长连接，
+    并按接口记录请求耗时
+    """
+
+    def __init__(self, base_url: str, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT, pool_size: int = DEFAULT_POOL_SIZE):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def set_timeouts(self, connect_timeout: float, read_timeout: float):
+        """设置连接和读取超时"""
+        self.timeout = (connect_timeout, read_timeout)
+
+    def request(self, method: str, path: str, **kwargs):
+        """发送请求，未指定超时时使用默认超时"""
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = f"{method.upper()} {path}"
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.RequestException as e:
+            elapsed = time.perf_counter() - start
+            self._record(endpoint, elapsed, failed=True)
+            instrumentation.observe('panel_http_request', elapsed, panel=self.base_url, method=method.upper(),
+                                    path=path, status=type(e).__name__)
+            raise
+        elapsed = time.perf_counter() - start
+        self._record(endpoint, elapsed, failed=response.status_code >= 400)
+        if instrumentation.enabled:
+            self._instrument(method.upper(), path, response, elapsed)
+        return response
+
+    def _instrument(self, method: str, path: str, response, elapsed: float):
+        labels = {'panel': self.base_url, 'method': method, 'path': path}
+        instrumentation.observe('panel_http_request', elapsed, status=str(response.status_code), **labels)
+        body = response.request.body
+        if body:
+            instrumentation.count('panel_http_request_bytes', len(body), **labels)
+        # 只读取响应头中的长度，不强制下载响应体
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit():
+            instrumentation.count('panel_http_response_bytes', int(length), **labels)
+
+    def _record(self, endpoint: str, elapsed: float, failed: bool):
+        with self._lock:
+            stat = self._stats.get(endpoint)
+            if stat is None:
+                stat = self._stats[endpoint] = {
+                    'count': 0, 'errors': 0, 'total': 0.0, 'min': elapsed, 'max': elapsed
+                }
+            stat['count'] += 1
+            stat['total'] += elapsed
+            stat['min'] = min(stat['min'], elapsed)
+            stat['max'] = max(stat['max'], elapsed)
+            if failed:
+                stat['errors'] += 1
+
+    def get_stats(self):
+        """获取各接口的延迟统计（单位：秒）"""
+        with self._lock:
+            stats = {}
+            for endpoint, stat in self._stats.items():
+                stats[endpoint] = dict(stat, avg=stat['total'] / stat['count'])
+            return stats
+
+    def reset_stats(self):
+        """清空延迟统计"""
+        with self._lock:
+            self._stats.clear()
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+def get_transport(base_url: str) -> PanelTransport:
+    """获取面板地址对应的共享传输层实例"""
+    key = base_url.rstrip('/')
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = _transports[key] = PanelTransport(key)
+        return transport
+
+def close_all_transports():
+    """关闭所有共享的连接池"""
+    with _transports_lock:
+        for transport in _transports.values():
+            transport.close()
+        _transports.clear()
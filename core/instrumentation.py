@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+
+# 滚动日志单个文件大小上限和保留的旧文件数
+DEFAULT_LOG_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_LOG_BACKUP_COUNT = 3
+# Prometheus文本文件的最短写入间隔（秒）
+DEFAULT_EXPORT_INTERVAL = 10
+# 指标名称前缀
+METRIC_PREFIX = 'jd_helper_'
+
+@dataclass
+class MetricEvent:
+    """一次计时或计数"""
+    kind: str  # 'timer' or 'count'
+    name: str
+    value: float
+    labels: dict = field(default_factory=dict)
+    timestamp: float = 0.0
+
+class Sink:
+    """指标输出接口，子类实现emit，可能在任意线程中被调用"""
+
+    def emit(self, event: MetricEvent):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+def _series_key(event: MetricEvent):
+    return event.kind, event.name, tuple(sorted(event.labels.items()))
+
+class _Aggregator:
+    """按(类型, 名称, 标签)汇总次数、总量、最小值和最大值"""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def add(self, event: MetricEvent):
+        key = _series_key(event)
+        with self._lock:
+            stat = self._series.get(key)
+            if stat is None:
+                stat = self._series[key] = {'count': 0, 'total': 0.0, 'min': event.value, 'max': event.value}
+            stat['count'] += 1
+            stat['total'] += event.value
+            stat['min'] = min(stat['min'], event.value)
+            stat['max'] = max(stat['max'], event.value)
+
+    def items(self) -> list:
+        with self._lock:
+            return [(key, dict(stat)) for key, stat in self._series.items()]
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+class MemorySink(Sink):
+    """在内存中汇总指标，供界面统计窗口读取"""
+
+    def __init__(self):
+        self._aggregator = _Aggregator()
+
+    def emit(self, event: MetricEvent):
+        self._aggregator.add(event)
+
+    def snapshot(self) -> list:
+        """汇总结果列表，计时的单位为秒"""
+        rows = []
+        for (kind, name, labels), stat in self._aggregator.items():
+            rows.append(dict(stat, kind=kind, name=name, labels=dict(labels), avg=stat['total'] / stat['count']))
+        rows.sort(key=lambda row: (row['name'], sorted(row['labels'].items())))
+        return rows
+
+    def reset(self):
+        self._aggregator.clear()
+
+class RollingLogSink(Sink):
+    """每个事件写一行JSON到滚动日志文件"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_LOG_MAX_BYTES,
+                 backup_count: int = DEFAULT_LOG_BACKUP_COUNT):
+        self.path = path
+        self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def emit(self, event: MetricEvent):
+        message = json.dumps({
+            'ts': round(event.timestamp, 3),
+            'kind': event.kind,
+            'name': event.name,
+            'value': round(event.value, 6),
+            'labels': event.labels,
+        }, ensure_ascii=False)
+        self._handler.emit(logging.makeLogRecord({'msg': message, 'levelno': logging.INFO}))
+
+    def flush(self):
+        self._handler.flush()
+
+    def close(self):
+        self._handler.close()
+
+def _metric_name(name: str) -> str:
+    return METRIC_PREFIX + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{re.sub(r"[^a-zA-Z0-9_]", "_", key)}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+class PrometheusSink(Sink):
+    """汇总指标并写入Prometheus文本格式文件，供node_exporter的textfile收集器读取
+
+    计时输出为summary（_seconds_count、_seconds_sum）和_seconds_max，计数输出为_total；
+    文件最多每interval秒重写一次，先写临时文件再替换，读取方不会看到写了一半的内容
+    """
+
+    def __init__(self, path: str, interval: float = DEFAULT_EXPORT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._aggregator = _Aggregator()
+        self._last_write = 0.0
+        self._write_lock = threading.Lock()
+
+    def emit(self, event: MetricEvent):
+        self._aggregator.add(event)
+        if time.monotonic() - self._last_write >= self.interval:
+            self.flush()
+
+    def render(self) -> str:
+        """生成Prometheus文本格式内容"""
+        families = {}
+        for (kind, name, labels), stat in self._aggregator.items():
+            families.setdefault((kind, name), []).append((labels, stat))
+        lines = []
+        for (kind, name), series in sorted(families.items(), key=lambda item: item[0][1]):
+            metric = _metric_name(name)
+            if kind == 'timer':
+                lines.append(f'# TYPE {metric}_seconds summary')
+                for labels, stat in series:
+                    lines.append(f'{metric}_seconds_count{_format_labels(labels)} {stat["count"]}')
+                    lines.append(f'{metric}_seconds_sum{_format_labels(labels)} {stat["total"]:.6f}')
+                lines.append(f'# TYPE {metric}_seconds_max gauge')
+                for labels, stat in series:
+                    lines.append(f'{metric}_seconds_max{_format_labels(labels)} {stat["max"]:.6f}')
+            else:
+                lines.append(f'# TYPE {metric}_total counter')
+                for labels, stat in series:
+                    lines.append(f'{metric}_total{_format_labels(labels)} {stat["total"]:g}')
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        # 其他线程正在写入时直接返回，下一次emit或flush会写入最新数据
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_write = time.monotonic()
+            temp_path = f'{self.path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"写入指标文件失败: {str(e)}")
+        finally:
+            self._write_lock.release()
+
+class Instrumentation:
+    """计时和计数的埋点入口，事件分发给所有已注册的Sink
+
+    未注册Sink时埋点只做一次判断，几乎没有开销
+    """
+
+    def __init__(self):
+        self._sinks = ()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._sinks)
+
+    def add_sink(self, sink: Sink) -> Sink:
+        with self._lock:
+            self._sinks = self._sinks + (sink,)
+        return sink
+
+    def remove_sink(self, sink: Sink):
+        with self._lock:
+            self._sinks = tuple(s for s in self._sinks if s is not sink)
+
+    def emit(self, kind: str, name: str, value: float, labels: dict):
+        sinks = self._sinks
+        if not sinks:
+            return
+        event = MetricEvent(kind, name, value, labels, time.time())
+        for sink in sinks:
+            try:
+                sink.emit(event)
+            except Exception as e:
+                print(f"输出指标失败: {str(e)}")
+
+    def count(self, name: str, value: float = 1, **labels):
+        """记录一次计数，例如请求字节数或Cookie事件"""
+        if self._sinks:
+            self.emit('count', name, value, labels)
+
+    def observe(self, name: str, seconds: float, **labels):
+        """记录一次已测量的耗时"""
+        if self._sinks:
+            self.emit('timer', name, seconds, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """计时代码块，可在块内修改返回的标签；抛出异常时标记outcome=error"""
+        if not self._sinks:
+            yield labels
+            return
+        start = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            labels.setdefault('outcome', 'error')
+            raise
+        finally:
+            labels.setdefault('outcome', 'ok')
+            self.emit('timer', name, time.perf_counter() - start, labels)
+
+    def flush(self):
+        for sink in self._sinks:
+            sink.flush()
+
+    def close(self):
+        """关闭并移除所有Sink"""
+        with self._lock:
+            sinks, self._sinks = self._sinks, ()
+        for sink in sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"关闭指标输出失败: {str(e)}")
+
+    def configure_from_env(self):
+        """按环境变量启用文件输出：JD_HELPER_METRICS_LOG为滚动日志路径，JD_HELPER_METRICS_PROM为Prometheus文件路径"""
+        log_path = os.environ.get('JD_HELPER_METRICS_LOG')
+        if log_path:
+            self.add_sink(RollingLogSink(log_path))
+        prom_path = os.environ.get('JD_HELPER_METRICS_PROM')
+        if prom_path:
+            self.add_sink(PrometheusSink(prom_path))
+
+# 进程内共享的埋点实例
+instrumentation = Instrumentation()
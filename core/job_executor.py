@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class JobCancelled(Exception):
+    """任务被取消"""
+
+class JobSignals(QObject):
+    """任务与界面通信的信号，跨线程时自动排队到界面线程执行"""
+    progress = pyqtSignal(str)
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+class Job(QRunnable):
+    """后台任务
+
+    被执行的函数第一个参数为任务本身，可通过它汇报进度和检查是否被取消
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """请求取消任务"""
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """任务已被取消时抛出JobCancelled"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def report_progress(self, message: str):
+        """汇报任务进度"""
+        self.signals.progress.emit(message)
+
+    def run(self):
+        try:
+            result = self.func(self, *self.args, **self.kwargs)
+            self.check_cancelled()
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            # 取消后请求被中断引发的异常同样视为取消
+            if self.is_cancelled():
+                self.signals.cancelled.emit()
+            else:
+                self.signals.error.emit(str(e))
+        else:
+            self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+class JobExecutor(QObject):
+    """基于QThreadPool的后台任务执行器，面板请求和数据库操作都在这里执行"""
+    # 所有任务都已结束
+    drained = pyqtSignal()
+
+    def __init__(self, max_workers: int = 4, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        self._jobs = set()
+
+    def submit(self, func, *args, on_result=None, on_error=None, on_progress=None,
+               on_cancelled=None, on_finished=None, **kwargs) -> Job:
+        """提交后台任务，回调均在界面线程中执行"""
+        job = Job(func, *args, **kwargs)
+        if on_result:
+            job.signals.result.connect(on_result)
+        if on_error:
+            job.signals.error.connect(on_error)
+        if on_progress:
+            job.signals.progress.connect(on_progress)
+        if on_cancelled:
+            job.signals.cancelled.connect(on_cancelled)
+        if on_finished:
+            job.signals.finished.connect(on_finished)
+        job.signals.finished.connect(lambda: self._on_finished(job))
+        # 保持引用，避免任务执行期间被回收
+        self._jobs.add(job)
+        self.pool.start(job)
+        return job
+
+    def _on_finished(self, job: Job):
+        self._jobs.discard(job)
+        if not self._jobs:
+            self.drained.emit()
+
+    def active_count(self) -> int:
+        return len(self._jobs)
+
+    def cancel_all(self):
+        """取消所有未完成的任务"""
+        for job in list(self._jobs):
+            job.cancel()
+
+    def shutdown(self, timeout_ms: int = 3000) -> bool:
+        """取消所有任务并等待线程池退出"""
+        self.cancel_all()
+        return self.pool.waitForDone(timeout_ms)
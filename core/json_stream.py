@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import codecs
+import json
+
+# 已解析部分超过该长度时丢弃，缓冲区大小与单个元素相当而不是整个响应
+_COMPACT_THRESHOLD = 64 * 1024
+_WHITESPACE = ' \t\n\r'
+
+class _StreamBuffer:
+    """按需从数据块中读取文本的缓冲区"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.text = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """读取下一个数据块，已到结尾时返回False"""
+        if self.eof:
+            return False
+        if self.pos > _COMPACT_THRESHOLD:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        for chunk in self.chunks:
+            text = self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                self.text += text
+                return True
+        self.text += self.decoder.decode(b'', final=True)
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """跳过空白并返回下一个字符，已到结尾时返回空字符串"""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"JSON格式错误：位置{self.pos}处应为{chars}，实际为{char or '结尾'}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """解析一个完整的JSON值"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # 数字等值可能被数据块截断，确认其后还有内容再接受
+            rest = end
+            while rest < len(self.text) and self.text[rest] in _WHITESPACE:
+                rest += 1
+            if rest == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+def load_json_stream(chunks, array_key: str, item_factory=None) -> dict:
+    """增量解析顶层为对象的JSON响应
+
+    array_key对应的数组逐个元素解析，每个元素经item_factory转换后保存，
+    item_factory返回None的元素被丢弃；其余字段按原样返回。
+    任何时刻只需在内存中保留一个元素的原始文本
+    """
+    buffer = _StreamBuffer(chunks)
+    result = {}
+    buffer.expect('{')
+    if buffer.peek() == '}':
+        buffer.pos += 1
+        return result
+    while True:
+        key = buffer.value()
+        if not isinstance(key, str):
+            raise ValueError('JSON格式错误：对象的键必须是字符串')
+        buffer.expect(':')
+        if key == array_key and buffer.peek() == '[':
+            buffer.pos += 1
+            items = []
+            if buffer.peek() == ']':
+                buffer.pos += 1
+            else:
+                while True:
+                    item = buffer.value()
+                    if item_factory is not None:
+                        item = item_factory(item)
+                    if item is not None:
+                        items.append(item)
+                    if buffer.expect(',]') == ']':
+                        break
+            result[key] = items
+        else:
+            result[key] = buffer.value()
+        if buffer.expect(',}') == '}':
+            return result
@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+try:
+    import psutil
+except ImportError:
+    # psutil为可选依赖，未安装时在Linux上读取/proc
+    psutil = None
+
+def process_rss(pid: int = None) -> int:
+    """进程的常驻内存（字节），无法获取时返回0"""
+    pid = pid or os.getpid()
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except Exception:
+            return 0
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
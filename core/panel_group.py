@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from database.storage import get_storage
+from core.qinglong_panel import QinglongPanel
+
+# 同时同步的面板数量上限
+DEFAULT_MAX_WORKERS = 4
+
+@dataclass
+class PanelResult:
+    """单个面板的同步结果"""
+    panel_url: str
+    success: bool
+    error: str = ''
+    elapsed: float = 0.0
+    results: list = field(default_factory=list)  # 批量同步时每个账号的SyncResult
+
+class PanelGroup:
+    """多个青龙面板的集合
+
+    同一份Cookie并发同步到所有已保存的面板，总耗时接近最慢的那个面板，
+    每个面板单独报告成功或失败
+    """
+
+    def __init__(self, panels: list = None, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._panels = {}
+        self._lock = threading.Lock()
+        if panels is None:
+            self.reload()
+        else:
+            for panel in panels:
+                self._panels[panel.panel_url] = panel
+
+    def reload(self):
+        """从数据库重新加载面板列表，已加载的面板沿用原实例以保留token和环境变量镜像"""
+        configs = get_storage().load_configs()
+        with self._lock:
+            current = self._panels
+            self._panels = {}
+            for config in configs:
+                panel = current.get(config[0])
+                if panel is None:
+                    panel = QinglongPanel(config)
+                self._panels[config[0]] = panel
+
+    def panels(self) -> list:
+        """所有面板，最近保存的在前"""
+        with self._lock:
+            return list(self._panels.values())
+
+    def get(self, panel_url: str):
+        with self._lock:
+            return self._panels.get(panel_url)
+
+    def save_panel(self, panel_url: str, client_id: str, client_secret: str) -> str:
+        """保存面板配置并获取token，新面板加入列表"""
+        panel = self.get(panel_url) or QinglongPanel(config=(panel_url, client_id, client_secret, None, None))
+        token = panel.save_config(panel_url, client_id, client_secret)
+        with self._lock:
+            self._panels.pop(panel_url, None)
+            # 最近保存的面板排在最前
+            self._panels = {panel_url: panel, **self._panels}
+        return token
+
+    def remove_panel(self, panel_url: str):
+        """删除面板配置"""
+        get_storage().delete_config(panel_url)
+        with self._lock:
+            self._panels.pop(panel_url, None)
+
+    def sync_cookie(self, cookie_str: str, remarks: str = '', cancel_event: threading.Event = None) -> list:
+        """将一个账号的Cookie并发同步到所有面板，返回每个面板的PanelResult"""
+        panel_results = self._fan_out(lambda panel: panel.sync_cookie(cookie_str, remarks, cancel_event))
+        if remarks and all(panel_result.success for panel_result in panel_results):
+            self._mark_synced([remarks])
+        return panel_results
+
+    def sync_cookies(self, accounts: list, cancel_event: threading.Event = None) -> list:
+        """将多个账号并发批量同步到所有面板，PanelResult.results为各账号的同步结果"""
+        panel_results = self._fan_out(lambda panel: panel.sync_cookies(accounts, cancel_event))
+        # 记录在所有面板上都同步成功的账号
+        synced = [
+            remarks for (_, remarks), error in zip(accounts, self.account_errors(panel_results, len(accounts)))
+            if remarks and error is None
+        ]
+        if synced:
+            self._mark_synced(synced)
+        return panel_results
+
+    @staticmethod
+    def account_errors(panel_results: list, count: int) -> list:
+        """批量同步后每个账号的错误信息，取第一个失败面板的错误，在所有面板上都同步成功的账号为None"""
+        errors = []
+        for index in range(count):
+            failed = [
+                (panel_result.results[index].error if panel_result.results else panel_result.error) or '同步失败'
+                for panel_result in panel_results
+                if not (panel_result.results and panel_result.results[index].success)
+            ]
+            errors.append(failed[0] if failed else None)
+        return errors
+
+    def _mark_synced(self, remarks_list: list):
+        # 备注即账号的pt_pin，未保存到数据库的账号不受影响
+        try:
+            get_storage().mark_cookies_synced(remarks_list)
+        except Exception as e:
+            print(f"记录同步时间失败: {str(e)}")
+
+    def disable_accounts(self, remarks_list: list) -> list:
+        """并发禁用所有面板上这些账号的JD_COOKIE变量"""
+        def disable(panel):
+            panel.disable_cookie_envs(remarks_list)
+        
+        return self._fan_out(disable)
+
+    def _fan_out(self, func) -> list:
+        panels = self.panels()
+        if not panels:
+            raise Exception('请先配置青龙面板信息')
+
+        def run(panel):
+            start = time.perf_counter()
+            try:
+                results = func(panel) or []
+            except Exception as e:
+                return PanelResult(panel.panel_url, False, str(e), time.perf_counter() - start)
+            failed = [result for result in results if not result.success]
+            error = f'{len(failed)}个账号同步失败' if failed else ''
+            return PanelResult(panel.panel_url, not failed, error, time.perf_counter() - start, results)
+
+        if len(panels) == 1:
+            return [run(panels[0])]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(panels))) as executor:
+            return list(executor.map(run, panels))
@@ -1,235 +1,462 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import threading
 import requests
 from dataclasses import dataclass
 from datetime import datetime
-from database.models import init_db
+from database.storage import get_storage
+from core.http_transport import get_transport, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from core.env_mirror import EnvMirror, EnvRecord, DEFAULT_MIRROR_TTL
+from core.json_stream import load_json_stream
+from core.resilience import RetryPolicy, CircuitOpenError, RateLimitTimeout, get_panel_guard
+from core.token_manager import TokenManager
+from core.instrumentation import instrumentation
+
+# 本程序管理的环境变量名称
+COOKIE_ENV_NAME = 'JD_COOKIE'
+# 流式读取响应的数据块大小
+STREAM_CHUNK_SIZE = 64 * 1024
+
+@dataclass
+class SyncResult:
+    """单个账号的同步结果"""
+    remarks: str
+    action: str  # 'create', 'update' or 'invalid'
+    success: bool
+    error: str = ''
 
 class QinglongPanel:
-    def __init__(self):
-        self.conn = init_db()
+    def __init__(self, config: tuple = None, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT, mirror_ttl: float = DEFAULT_MIRROR_TTL,
+                 retry_policy: RetryPolicy = None):
+        """config为数据库中的一行面板配置，未指定时加载最近保存的配置"""
+        self.storage = get_storage()
+        self.timeout = (connect_timeout, read_timeout)
+        # 临时故障自动重试；熔断和限流由同一面板地址的所有实例共享，见get_panel_guard
+        self.retry_policy = retry_policy or RetryPolicy()
         self.panel_url = None
         self.client_id = None
         self.client_secret = None
-        self.token = None
-        self.load_config()
+        # token过期前自动刷新，被面板拒绝时重新认证
+        self.token_manager = TokenManager(self._fetch_current_token, on_refreshed=self._save_token)
+        # 面板JD_COOKIE变量的本地镜像，避免每次同步都重新下载
+        self.env_mirror = EnvMirror(mirror_ttl)
+        if config is None:
+            self.load_config()
+        else:
+            self.apply_config(config)
+    
+    @classmethod
+    def load_all(cls, **kwargs) -> list:
+        """为数据库中保存的每个面板创建一个实例"""
+        return [cls(config, **kwargs) for config in get_storage().load_configs()]
     
     def load_config(self):
         """加载青龙面板配置"""
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT panel_url, client_id, client_secret, token FROM qinglong_config ORDER BY id DESC LIMIT 1"
-            )
-            result = cursor.fetchone()
+            result = self.storage.load_config()
             
             if result:
-                self.panel_url = result[0]
-                self.client_id = result[1]
-                self.client_secret = result[2]
-                self.token = result[3]
+                self.apply_config(result)
                 
         except Exception as e:
             print(f"加载配置失败: {str(e)}")
     
-    def save_config(self, panel_url: str, client_id: str, client_secret: str):
-        """保存青龙面板配置"""
-        try:
-            # 获取token
-            response = requests.get(
-                f"{panel_url}/open/auth/token",
-                headers={
-                    'Content-Type': 'application/json'
-                },
+    def apply_config(self, config: tuple):
+        """使用(panel_url, client_id, client_secret, token, token_expires_at)配置当前实例"""
+        self.panel_url = config[0]
+        self.client_id = config[1]
+        self.client_secret = config[2]
+        self.token_manager.set_token(config[3], config[4])
+    
+    @property
+    def token(self):
+        return self.token_manager.token
+    
+    @token.setter
+    def token(self, token):
+        self.token_manager.set_token(token)
+    
+    def _fetch_token(self, panel_url: str, client_id: str, client_secret: str):
+        """向面板申请token，返回(token, 过期时间戳)"""
+        with instrumentation.timer('panel_auth', panel=panel_url):
+            data = self._request(
+                'GET', '/open/auth/token', '获取token',
+                panel_url=panel_url,
+                auth=False,
                 params={
                     'client_id': client_id,
                     'client_secret': client_secret
                 }
             )
-            
-            if response.status_code != 200:
-                raise Exception(f"获取token失败: {response.text}")
-                
-            data = response.json()
-            if data.get('code') != 200:
-                error_msg = data.get('message', '') or data.get('msg', '') or response.text
-                raise Exception(f"获取token失败: {error_msg}")
-                
-            token = data['data']['token']
+        return data['token'], data.get('expiration')
+    
+    def _fetch_current_token(self):
+        """使用已保存的client_id和client_secret重新获取token"""
+        if not all([self.panel_url, self.client_id, self.client_secret]):
+            raise Exception('请先配置青龙面板信息')
+        return self._fetch_token(self.panel_url, self.client_id, self.client_secret)
+    
+    def _save_token(self, token: str, expires_at: float):
+        """自动刷新的token写回数据库"""
+        try:
+            self.storage.update_token(self.panel_url, token, expires_at)
+        except Exception as e:
+            print(f"保存token失败: {str(e)}")
+    
+    def save_config(self, panel_url: str, client_id: str, client_secret: str):
+        """保存青龙面板配置"""
+        try:
+            # 获取token
+            token, expires_at = self._fetch_token(panel_url, client_id, client_secret)
             # print(f"获取token成功: {token}")
             # 保存到数据库
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "INSERT OR REPLACE INTO qinglong_config (panel_url, client_id, client_secret, token) VALUES (?, ?, ?, ?)",
-                (panel_url, client_id, client_secret, token)
-            )
-            self.conn.commit()
+            self.storage.save_config(panel_url, client_id, client_secret, token, expires_at)
             
             # 更新实例变量
+            if panel_url != self.panel_url:
+                self.env_mirror.invalidate()
             self.panel_url = panel_url
             self.client_id = client_id
             self.client_secret = client_secret
-            self.token = token
+            self.token_manager.set_token(token, expires_at)
             
             return token
             
         except Exception as e:
             raise Exception(f'保存配置失败：{str(e)}')
     
-    def get_envs(self):
-        """获取环境变量列表"""
-        if not all([self.panel_url, self.token]):
+    def set_timeouts(self, connect_timeout: float, read_timeout: float):
+        """设置请求的连接超时和读取超时（秒）"""
+        self.timeout = (connect_timeout, read_timeout)
+    
+    def get_latency_stats(self):
+        """获取当前面板各接口的延迟统计"""
+        if not self.panel_url:
+            return {}
+        return get_transport(self.panel_url).get_stats()
+    
+    def _request(self, method: str, path: str, action: str, panel_url: str = None, auth: bool = True,
+                 item_factory=None, **kwargs):
+        """通过共享连接池发送请求，并校验青龙面板的返回结果
+
+        指定item_factory时流式读取响应，data数组的元素逐个解析并经item_factory转换，
+        大列表不需要先完整读入内存
+        """
+        panel_url = panel_url or self.panel_url
+        if auth and not (panel_url and (self.token or self.client_id)):
             raise Exception('请先配置青龙面板信息')
-            
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
         
-        response = requests.get(f"{self.panel_url}/open/envs", headers=headers)
+        stream = item_factory is not None
+        token = self.token_manager.get_token() if auth else None
+        response = self._send(panel_url, method, path, action, token, stream=stream, **kwargs)
+        if auth and response.status_code == 401:
+            # token失效，重新认证后重试一次
+            response.close()
+            token = self.token_manager.refresh(token)
+            response = self._send(panel_url, method, path, action, token, stream=stream, **kwargs)
+        
         if response.status_code != 200:
-            raise Exception(f"获取环境变量失败: {response.text}")
+            raise Exception(f"{action}失败: {response.text}")
             
-        data = response.json()
+        if stream:
+            try:
+                data = load_json_stream(response.iter_content(STREAM_CHUNK_SIZE), 'data', item_factory)
+            except (ValueError, requests.RequestException) as e:
+                raise Exception(f"{action}失败: 响应解析错误 {str(e)}")
+            finally:
+                response.close()
+        else:
+            data = response.json()
         if data.get('code') != 200:
-            error_msg = data.get('message', '') or data.get('msg', '') or response.text
-            raise Exception(f"获取环境变量失败: {error_msg}")
+            # 流式读取时响应体已经被消费，只能使用解析出的返回码
+            error_msg = data.get('message', '') or data.get('msg', '') or \
+                (f"code={data.get('code')}" if stream else response.text)
+            raise Exception(f"{action}失败: {error_msg}")
             
-        return data['data']
+        return data.get('data')
+    
+    def _send(self, panel_url: str, method: str, path: str, action: str, token: str = None, **kwargs):
+        """发送请求，临时故障按重试策略重试，网络异常转换为带操作名称的异常"""
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        transport = get_transport(panel_url)
+        try:
+            return get_panel_guard(panel_url).execute(
+                method,
+                lambda: transport.request(method, path, headers=headers, timeout=self.timeout, **kwargs),
+                self.retry_policy
+            )
+        except (CircuitOpenError, RateLimitTimeout) as e:
+            raise Exception(f"{action}失败: {str(e)}")
+        except requests.Timeout:
+            raise Exception(f"{action}失败: 请求超时")
+        except requests.RequestException as e:
+            raise Exception(f"{action}失败: {str(e)}")
+    
+    def get_envs(self, search_value: str = None, name: str = None) -> list:
+        """获取环境变量列表，返回EnvRecord列表
+
+        search_value交给面板按名称、值和备注筛选，name在本地精确匹配变量名；
+        未筛选时同时刷新本地镜像
+        """
+        def make_record(env):
+            if name is not None and env.get('name') != name:
+                return None
+            return EnvRecord.from_dict(env)
+        
+        params = {'searchValue': search_value} if search_value else None
+        with instrumentation.timer('panel_env_download', panel=self.panel_url):
+            envs = self._request('GET', '/open/envs', '获取环境变量', item_factory=make_record, params=params) or []
+        instrumentation.count('panel_env_count', len(envs), panel=self.panel_url)
+        if search_value is None and name is None:
+            self.env_mirror.load(envs)
+        return envs
+    
+    def get_cookie_envs(self) -> list:
+        """只获取JD_COOKIE变量并刷新本地镜像，传输量和内存与账号数成正比而不是整个变量表"""
+        envs = self.get_envs(search_value=COOKIE_ENV_NAME, name=COOKIE_ENV_NAME)
+        self.env_mirror.load(envs)
+        return envs
     
     def update_env(self, env_id: int, name: str, value: str, remarks: str = ''):
         """更新环境变量"""
-        if not all([self.panel_url, self.token]):
-            raise Exception('请先配置青龙面板信息')
-            
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
+        env = {
+            'id': env_id,
+            'name': name,
+            'value': value,
+            'remarks': remarks
         }
-        
-        response = requests.put(
-            f"{self.panel_url}/open/envs",
-            headers=headers,
-            json={
-                'id': env_id,
-                'name': name,
-                'value': value,
-                'remarks': remarks
-            }
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"更新环境变量失败: {response.text}")
-            
-        data = response.json()
-        if data.get('code') != 200:
-            error_msg = data.get('message', '') or data.get('msg', '') or response.text
-            raise Exception(f"更新环境变量失败: {error_msg}")
+        data = self._request('PUT', '/open/envs', '更新环境变量', json=env)
+        self.env_mirror.upsert(data if isinstance(data, dict) else env)
+        return data
 
     def create_env(self, name: str, value: str, remarks: str = ''):
         """创建新的环境变量"""
-        if not all([self.panel_url, self.token]):
-            raise Exception('请先配置青龙面板信息')
-            
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.post(
-            f"{self.panel_url}/open/envs",
-            headers=headers,
-            json=[{
-                'name': name,
-                'value': value,
-                'remarks': remarks
-            }]
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"创建环境变量失败: {response.text}")
-            
-        data = response.json()
-        if data.get('code') != 200:
-            error_msg = data.get('message', '') or data.get('msg', '') or response.text
-            raise Exception(f"创建环境变量失败: {error_msg}")
+        return self.create_envs([{
+            'name': name,
+            'value': value,
+            'remarks': remarks
+        }])
+    
+    def create_envs(self, envs: list):
+        """批量创建环境变量，一次请求提交全部"""
+        data = self._request('POST', '/open/envs', '创建环境变量', json=envs)
+        self._mirror_created(data)
+        return data
     
     def enable_env(self, env_ids: list):
         """启用环境变量"""
-        if not all([self.panel_url, self.token]):
-            raise Exception('请先配置青龙面板信息')
-            
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.put(
-            f"{self.panel_url}/open/envs/enable",
-            headers=headers,
-            json=env_ids
-        )
+        data = self._request('PUT', '/open/envs/enable', '启用环境变量', json=env_ids)
+        self.env_mirror.set_status(env_ids, 0)
+        return data
+    
+    def disable_env(self, env_ids: list):
+        """禁用环境变量"""
+        data = self._request('PUT', '/open/envs/disable', '禁用环境变量', json=env_ids)
+        self.env_mirror.set_status(env_ids, 1)
+        return data
+    
+    def disable_cookie_envs(self, remarks_list: list) -> list:
+        """禁用备注在remarks_list中的JD_COOKIE变量，返回被禁用的变量id"""
+        if self.env_mirror.is_stale():
+            self.get_cookie_envs()
+        env_ids = []
+        for remarks in remarks_list:
+            env = self.env_mirror.get(COOKIE_ENV_NAME, remarks)
+            if env is not None and env.get('status') != 1:
+                env_ids.append(env['id'])
+        if env_ids:
+            self.disable_env(env_ids)
+        return env_ids
+    
+    def _mirror_created(self, data):
+        """将面板返回的新建变量写入镜像，无法识别返回内容时让镜像失效"""
+        if isinstance(data, list):
+            for env in data:
+                self.env_mirror.upsert(env)
+        else:
+            self.env_mirror.invalidate()
+    
+    def _write_cookie_env(self, cookie_str: str, remarks: str, cancel_event: threading.Event = None):
+        """根据镜像中的JD_COOKIE变量决定更新还是创建"""
+        current_env = self.env_mirror.get(COOKIE_ENV_NAME, remarks)
         
-        if response.status_code != 200:
-            raise Exception(f"启用环境变量失败: {response.text}")
+        if current_env:
+            # 更新已存在的环境变量
+            self.update_env(
+                env_id=current_env['id'],
+                name=COOKIE_ENV_NAME,
+                value=cookie_str,
+                remarks=remarks
+            )
             
-        data = response.json()
-        if data.get('code') != 200:
-            error_msg = data.get('message', '') or data.get('msg', '') or response.text
-            raise Exception(f"启用环境变量失败: {error_msg}")
+            # 如果变量是禁用状态，则启用它
+            if current_env.get('status') == 1:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise Exception('同步已取消')
+                self.enable_env([current_env['id']])
+        else:
+            # 创建新的环境变量
+            self.create_env(
+                name=COOKIE_ENV_NAME,
+                value=cookie_str,
+                remarks=remarks
+            )
+
+    def sync_cookie(self, cookie_str: str, remarks: str = '', cancel_event: threading.Event = None):
+        """同步Cookie到青龙面板
 
-    def sync_cookie(self, cookie_str: str, remarks: str = ''):
-        """同步Cookie到青龙面板"""
+        cancel_event被设置后，在下一次写入面板前中止同步
+        """
+        with instrumentation.timer('panel_sync_cookie', panel=self.panel_url):
+            self._sync_cookie(cookie_str, remarks, cancel_event)
+    
+    def _sync_cookie(self, cookie_str: str, remarks: str, cancel_event: threading.Event = None):
         try:
             # 验证cookie格式
             if not ('pt_key=' in cookie_str and 'pt_pin=' in cookie_str):
                 raise Exception('Cookie格式无效，必须包含pt_key和pt_pin')
             
-            # 获取环境变量列表
-            envs = self.get_envs()
-            
-            # 检查是否存在JD_COOKIE环境变量
-            jd_cookies = [env for env in envs if env['name'] == 'JD_COOKIE']
-            jd_cookies_with_remarks = [env for env in jd_cookies if env['remarks'] == remarks]
+            # 镜像过期时才重新获取环境变量列表
+            refreshed = self.env_mirror.is_stale()
+            if refreshed:
+                self.get_cookie_envs()
+            if cancel_event is not None and cancel_event.is_set():
+                raise Exception('同步已取消')
             
-            if jd_cookies_with_remarks:
-                # 获取当前变量的状态
-                current_env = jd_cookies_with_remarks[0]
+            mirrored = self.env_mirror.get(COOKIE_ENV_NAME, remarks) is not None
+            try:
+                self._write_cookie_env(cookie_str, remarks, cancel_event)
+            except Exception:
+                # 只重试更新操作，创建失败时重试可能产生重复变量
+                if refreshed or not mirrored or (cancel_event is not None and cancel_event.is_set()):
+                    raise
+                # 镜像可能与面板不一致（例如变量已在面板上被删除），重新获取后再试一次
+                self.get_cookie_envs()
+                self._write_cookie_env(cookie_str, remarks, cancel_event)
                 
-                # 更新已存在的环境变量
+        except Exception as e:
+            raise Exception(f'同步Cookie失败：{str(e)}')
+    
+    def sync_cookies(self, accounts: list, cancel_event: threading.Event = None) -> list:
+        """批量同步多个账号的Cookie
+
+        accounts为(cookie_str, remarks)列表，环境变量列表最多获取一次，
+        所有新建变量合并为一次创建请求，所有需要启用的变量合并为一次启用请求，
+        返回与accounts顺序一致的SyncResult列表
+        """
+        with instrumentation.timer('panel_sync_cookies', panel=self.panel_url):
+            results = self._sync_cookies(accounts, cancel_event)
+        failed = sum(1 for result in results if not result.success)
+        instrumentation.count('panel_sync_accounts', len(results) - failed, panel=self.panel_url, outcome='ok')
+        instrumentation.count('panel_sync_accounts', failed, panel=self.panel_url, outcome='error')
+        return results
+    
+    def _sync_cookies(self, accounts: list, cancel_event: threading.Event = None) -> list:
+        results = [None] * len(accounts)
+        # 同一备注出现多次时以最后一个为准
+        latest = {}
+        for index, (cookie_str, remarks) in enumerate(accounts):
+            if not ('pt_key=' in cookie_str and 'pt_pin=' in cookie_str):
+                results[index] = SyncResult(remarks, 'invalid', False, 'Cookie格式无效，必须包含pt_key和pt_pin')
+                continue
+            previous = latest.get(remarks)
+            if previous is not None:
+                results[previous] = SyncResult(remarks, 'invalid', False, '与后续账号重复，已跳过')
+            latest[remarks] = index
+        
+        if not latest:
+            return results
+        
+        refreshed = self.env_mirror.is_stale()
+        try:
+            if refreshed:
+                self.get_cookie_envs()
+        except Exception as e:
+            for index in latest.values():
+                results[index] = SyncResult(accounts[index][1], 'update', False, str(e))
+            return results
+        
+        creates = []
+        enables = {}
+        
+        def update(index, current_env) -> bool:
+            remarks = accounts[index][1]
+            try:
                 self.update_env(
                     env_id=current_env['id'],
-                    name='JD_COOKIE',
-                    value=cookie_str,
+                    name=COOKIE_ENV_NAME,
+                    value=accounts[index][0],
                     remarks=remarks
                 )
-                
-                # 如果变量是禁用状态，则启用它
-                if current_env.get('status') == 1:
-                    self.enable_env([current_env['id']])
+            except Exception as e:
+                results[index] = SyncResult(remarks, 'update', False, str(e))
+                return False
+            results[index] = SyncResult(remarks, 'update', True)
+            if current_env.get('status') == 1:
+                enables[current_env['id']] = index
+            return True
+        
+        # 按镜像将账号分为更新和创建两组
+        failed_updates = []
+        for remarks, index in latest.items():
+            current_env = self.env_mirror.get(COOKIE_ENV_NAME, remarks)
+            if current_env is None:
+                creates.append(index)
+                continue
+            
+            if cancel_event is not None and cancel_event.is_set():
+                results[index] = SyncResult(remarks, 'update', False, '同步已取消')
+                continue
+            if not update(index, current_env):
+                failed_updates.append(index)
+        
+        # 镜像可能与面板不一致（例如变量已在面板上被删除），与单账号同步相同，
+        # 重新获取一次环境变量后，更新失败的账号按新的镜像重新更新或创建
+        if failed_updates and not refreshed and not (cancel_event is not None and cancel_event.is_set()):
+            try:
+                self.get_cookie_envs()
+            except Exception:
+                # 保留原来的更新错误
+                failed_updates = []
+            for index in failed_updates:
+                current_env = self.env_mirror.get(COOKIE_ENV_NAME, accounts[index][1])
+                if current_env is None:
+                    creates.append(index)
+                else:
+                    update(index, current_env)
+        
+        if creates:
+            if cancel_event is not None and cancel_event.is_set():
+                error = '同步已取消'
             else:
-                # 创建新的环境变量
-                self.create_env(
-                    name='JD_COOKIE',
-                    value=cookie_str,
-                    remarks=remarks
-                )
-                
-        except Exception as e:
-            raise Exception(f'同步Cookie失败：{str(e)}')
-    
-    def __del__(self):
-        if hasattr(self, 'conn') and self.conn:
-            self.conn.close()
+                try:
+                    self.create_envs([
+                        {'name': COOKIE_ENV_NAME, 'value': accounts[index][0], 'remarks': accounts[index][1]}
+                        for index in creates
+                    ])
+                    error = ''
+                except Exception as e:
+                    error = str(e)
+            for index in creates:
+                results[index] = SyncResult(accounts[index][1], 'create', not error, error)
+        
+        if enables:
+            try:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise Exception('同步已取消')
+                self.enable_env(list(enables))
+            except Exception as e:
+                for index in enables.values():
+                    results[index] = SyncResult(accounts[index][1], 'update', False, str(e))
+        
+        return results
     
     def get_env_list(self):
-        """获取环境变量列表，主要是JD_COOKIE相关的变量"""
+        """获取JD_COOKIE环境变量列表"""
         try:
-            # 获取所有环境变量
-            envs = self.get_envs()
-            # 过滤出JD_COOKIE相关的变量
-            jd_cookies = [env for env in envs if env['name'] == 'JD_COOKIE']
-            return jd_cookies
+            # 由面板筛选JD_COOKIE变量
+            return self.get_cookie_envs()
         except Exception as e:
             raise Exception(f'获取环境变量列表失败：{str(e)}')
\ No newline at end of file
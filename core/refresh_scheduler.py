@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from database.storage import get_storage
+from core.cookie_utils import parse_cookie_str, format_essential_cookies
+
+# pt_key过期时间未知时的有效期估计（秒），京东一般为30天
+DEFAULT_COOKIE_LIFETIME = 30 * 86400
+# 正常情况下重新检测Cookie的间隔
+DEFAULT_CHECK_INTERVAL = 12 * 3600
+# 距离预计过期不足该时间时，检测间隔缩短为四分之一并提示重新登录
+DEFAULT_REFRESH_AHEAD = 3 * 86400
+# 已同步的账号定期重新同步，防止面板上的变量被修改或删除
+DEFAULT_RESYNC_INTERVAL = 24 * 3600
+# 每个账号的计划时间加上固定的随机偏移，避免所有账号同时到期
+DEFAULT_JITTER = 30 * 60
+# 检测失败（状态未知）后的首次重试间隔，之后每次失败加倍，最长为检测间隔
+DEFAULT_RETRY_BACKOFF = 5 * 60
+# 同时检测的账号数，以及一轮最多处理的账号数
+DEFAULT_MAX_CONCURRENCY = 2
+DEFAULT_MAX_BATCH = 10
+# 两轮之间的最短和最长等待时间（秒）
+MIN_WAIT = 60
+MAX_WAIT = 600
+
+@dataclass
+class AccountPlan:
+    """单个账号的刷新计划，时间均为Unix时间戳"""
+    user_pin: str
+    cookie: str
+    captured_at: float
+    expires_at: float
+    next_check_at: float
+    next_sync_at: float = None
+
+@dataclass
+class TickResult:
+    """一轮调度的结果"""
+    checked: list = field(default_factory=list)
+    expired: list = field(default_factory=list)
+    synced: list = field(default_factory=list)
+    unknown: dict = field(default_factory=dict)  # 检测失败的账号，user_pin -> 错误信息
+    failed: dict = field(default_factory=dict)  # 同步失败的账号，user_pin -> 错误信息
+    expiring: list = field(default_factory=list)
+    next_run_in: float = MAX_WAIT
+
+    def as_dict(self) -> dict:
+        return dict(self.__dict__, next_run_in=round(self.next_run_in, 1))
+
+class RefreshScheduler:
+    """按Cookie预计过期时间定期检测和同步账号
+
+    每个账号根据获取、检测和同步时间计算下一次需要处理的时间，
+    到期的账号分批处理：先检测是否有效，有效且面板上不是最新的则同步，
+    失效的账号标记为expired，disable_envs为True时同时禁用面板变量。检测失败的账号按指数退避重试，不影响同步。
+    每个账号的计划时间加上由pt_pin决定的固定偏移，账号之间自然错开
+    """
+
+    def __init__(self, panel_group=None, checker=None, storage=None,
+                 lifetime: float = DEFAULT_COOKIE_LIFETIME, check_interval: float = DEFAULT_CHECK_INTERVAL,
+                 refresh_ahead: float = DEFAULT_REFRESH_AHEAD, resync_interval: float = DEFAULT_RESYNC_INTERVAL,
+                 jitter: float = DEFAULT_JITTER, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_batch: int = DEFAULT_MAX_BATCH, retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+                 disable_envs: bool = False):
+        self.panel_group = panel_group
+        self.storage = storage or get_storage()
+        self.lifetime = lifetime
+        self.check_interval = check_interval
+        self.refresh_ahead = refresh_ahead
+        self.resync_interval = resync_interval
+        self.jitter = jitter
+        self.max_batch = max_batch
+        self.retry_backoff = retry_backoff
+        # 与命令行的check --disable-envs相同，只有显式开启时才禁用面板上失效账号的变量
+        self.disable_envs = disable_envs
+        # 检测连续失败的账号：user_pin -> (失败次数, 最近一次检测时间)
+        self._check_failures = {}
+        if checker is None:
+            from core.cookie_checker import CookieChecker
+            checker = CookieChecker(max_workers=max_concurrency)
+        self.checker = checker
+
+    def _offset(self, user_pin: str) -> float:
+        """账号固定的随机偏移，同一账号每次计算结果相同"""
+        return (zlib.crc32(user_pin.encode('utf-8')) % 10000) / 10000 * self.jitter
+
+    def plan(self, now: float = None) -> list:
+        """计算所有有效账号的刷新计划"""
+        now = now or time.time()
+        plans = []
+        # 浏览器记录了pt_key过期时间的账号使用实际过期时间，其余按获取时间估计
+        expiries = self.storage.load_cookie_expiries()
+        for user_pin, cookie, captured_at, synced_at, checked_at in self.storage.load_cookie_times():
+            captured_at = captured_at or now
+            expires_at = expiries.get(user_pin) or captured_at + self.lifetime
+            interval = self.check_interval
+            if expires_at - now < self.refresh_ahead:
+                interval /= 4
+            offset = self._offset(user_pin)
+            next_check_at = (checked_at or captured_at) + interval + offset
+            if user_pin in self._check_failures:
+                failures, attempted_at = self._check_failures[user_pin]
+                retry_delay = min(self.retry_backoff * 2 ** (failures - 1), self.check_interval)
+                next_check_at = max(next_check_at, attempted_at + retry_delay)
+            if synced_at is None or synced_at < captured_at:
+                # 新获取的Cookie尽快同步，只错开几十秒
+                next_sync_at = captured_at + offset / 60
+            else:
+                next_sync_at = synced_at + self.resync_interval + offset
+            plans.append(AccountPlan(user_pin, cookie, captured_at, expires_at, next_check_at, next_sync_at))
+        return plans
+
+    def next_run_in(self, plans: list = None, now: float = None) -> float:
+        """距离下一个账号到期的秒数，限制在[MIN_WAIT, MAX_WAIT]之间"""
+        now = now or time.time()
+        plans = self.plan(now) if plans is None else plans
+        due_times = [plan.next_check_at for plan in plans]
+        if self.panel_group is not None and self.panel_group.panels():
+            due_times += [plan.next_sync_at for plan in plans if plan.next_sync_at is not None]
+        if not due_times:
+            return MAX_WAIT
+        return min(max(min(due_times) - now, MIN_WAIT), MAX_WAIT)
+
+    def run_due(self, cancel_event: threading.Event = None) -> TickResult:
+        """处理一批到期的账号"""
+        now = time.time()
+        plans = self.plan(now)
+        result = TickResult(expiring=[plan.user_pin for plan in plans if plan.expires_at - now < self.refresh_ahead])
+
+        # 检测到期的账号，最早到期的优先
+        to_check = sorted(
+            (plan for plan in plans if plan.next_check_at <= now),
+            key=lambda plan: plan.next_check_at
+        )[:self.max_batch]
+        if to_check:
+            check_results = self.checker.check_stored(
+                user_pins=[plan.user_pin for plan in to_check],
+                panel_group=self.panel_group if self.disable_envs else None,
+                cancel_event=cancel_event
+            )
+            checked_at = time.time()
+            for check_result in check_results:
+                if check_result.alive is None:
+                    result.unknown[check_result.user_pin] = check_result.error
+                    failures = self._check_failures.get(check_result.user_pin, (0, 0))[0]
+                    self._check_failures[check_result.user_pin] = (failures + 1, checked_at)
+                else:
+                    self._check_failures.pop(check_result.user_pin, None)
+                    result.checked.append(check_result.user_pin)
+                    if check_result.alive is False:
+                        result.expired.append(check_result.user_pin)
+
+        # 同步需要更新到面板的账号，已失效的跳过；检测失败只说明状态未知，仍然同步
+        to_sync = []
+        has_panels = self.panel_group is not None and self.panel_group.panels()
+        if has_panels and not (cancel_event is not None and cancel_event.is_set()):
+            to_sync = sorted(
+                (plan for plan in plans
+                 if plan.next_sync_at is not None and plan.next_sync_at <= now
+                 and plan.user_pin not in result.expired),
+                key=lambda plan: plan.next_sync_at
+            )[:self.max_batch]
+            if to_sync:
+                accounts = [(format_essential_cookies(parse_cookie_str(plan.cookie)), plan.user_pin) for plan in to_sync]
+                panel_results = self.panel_group.sync_cookies(accounts, cancel_event)
+                for plan, error in zip(to_sync, self.panel_group.account_errors(panel_results, len(to_sync))):
+                    if error is not None:
+                        result.failed[plan.user_pin] = error
+                    else:
+                        result.synced.append(plan.user_pin)
+
+        result.next_run_in = self.next_run_in(now=time.time())
+        # 本轮因批量上限未处理完的账号尽快继续
+        if len(to_check) == self.max_batch or len(to_sync) == self.max_batch:
+            result.next_run_in = MIN_WAIT
+        return result
+
+    def run_forever(self, stop_event: threading.Event, on_tick=None):
+        """循环调度直到stop_event被设置，on_tick接收每一轮的TickResult"""
+        while not stop_event.is_set():
+            try:
+                result = self.run_due(stop_event)
+            except Exception as e:
+                print(f"定时刷新失败: {str(e)}")
+                result = TickResult(next_run_in=MIN_WAIT)
+            if on_tick is not None:
+                on_tick(result)
+            stop_event.wait(result.next_run_in)
+
+    def close(self):
+        self.checker.close()
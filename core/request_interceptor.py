@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from PyQt6.QtWebEngineCore import QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+from core.resource_rules import ResourceRules
+from core.instrumentation import instrumentation
+
+_TYPE_PREFIX = 'ResourceType'
+
+class ResourceBlocker(QWebEngineUrlRequestInterceptor):
+    """按ResourceRules拦截登录页面不需要的请求
+
+    安装到Profile后，该Profile下所有页面的请求都会经过interceptRequest，
+    该方法在WebEngine的IO线程中调用，统计数据用锁保护
+    """
+
+    def __init__(self, rules: ResourceRules = None, parent=None):
+        super().__init__(parent)
+        self.rules = rules or ResourceRules.load()
+        self._lock = threading.Lock()
+        self._allowed = {}
+        self._blocked = {}
+        self._blocked_hosts = {}
+
+    def interceptRequest(self, info: QWebEngineUrlRequestInfo):
+        resource_type = info.resourceType()
+        type_name = resource_type.name
+        if type_name.startswith(_TYPE_PREFIX):
+            type_name = type_name[len(_TYPE_PREFIX):]
+        host = info.requestUrl().host()
+        reason = self.rules.decide(
+            host,
+            type_name,
+            first_party_host=info.firstPartyUrl().host(),
+            main_frame=resource_type == QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMainFrame
+        )
+        with self._lock:
+            if reason:
+                self._blocked[type_name] = self._blocked.get(type_name, 0) + 1
+                self._blocked_hosts[host] = self._blocked_hosts.get(host, 0) + 1
+            else:
+                self._allowed[type_name] = self._allowed.get(type_name, 0) + 1
+        if reason:
+            info.block(True)
+            instrumentation.count('web_request_blocked', type=type_name, reason=reason)
+        else:
+            instrumentation.count('web_request_allowed', type=type_name)
+
+    def stats(self) -> dict:
+        """按资源类型统计的放行和拦截次数，以及被拦截最多的域名"""
+        with self._lock:
+            top_hosts = sorted(self._blocked_hosts.items(), key=lambda item: item[1], reverse=True)[:20]
+            return {
+                'allowed': dict(self._allowed),
+                'blocked': dict(self._blocked),
+                'allowed_total': sum(self._allowed.values()),
+                'blocked_total': sum(self._blocked.values()),
+                'blocked_hosts': dict(top_hosts),
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._allowed.clear()
+            self._blocked.clear()
+            self._blocked_hosts.clear()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import threading
+import time
+import requests
+from dataclasses import dataclass, field
+from core.rate_limiter import TokenBucket
+from core.instrumentation import instrumentation
+
+# 失败后最多重试次数
+DEFAULT_MAX_RETRIES = 3
+# 退避时间：第n次重试前等待 [0, min(BACKOFF_MAX, BACKOFF_BASE * 2^n)] 秒中的随机值
+DEFAULT_BACKOFF_BASE = 0.2
+DEFAULT_BACKOFF_MAX = 5.0
+# 连续失败多少次后熔断，熔断多少秒后放行一个探测请求
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIMEOUT = 30.0
+# 每个面板每秒最多请求数和允许的突发请求数
+DEFAULT_PANEL_RATE = 50
+DEFAULT_PANEL_BURST = 50
+# 等待令牌的最长时间（秒）
+DEFAULT_ACQUIRE_TIMEOUT = 30.0
+
+# 重复执行结果不变的请求方法，可以在任何网络错误后重试
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+# 面板暂时不可用的状态码
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+class CircuitOpenError(Exception):
+    """面板处于熔断状态，请求未发出"""
+
+class RateLimitTimeout(Exception):
+    """等待限流令牌超时，请求未发出"""
+
+def is_connect_error(error: Exception) -> bool:
+    """请求是否在建立连接阶段失败，此时面板一定没有收到请求"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError):
+        return False
+    # requests把urllib3的NewConnectionError包装在MaxRetryError.reason中
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return type(reason).__name__ == 'NewConnectionError'
+
+@dataclass
+class RetryPolicy:
+    """重试策略
+
+    幂等请求在网络错误和RETRY_STATUSES状态码后重试；
+    POST等非幂等请求只在连接失败时重试，避免面板重复创建变量
+    """
+    max_retries: int = DEFAULT_MAX_RETRIES
+    backoff_base: float = DEFAULT_BACKOFF_BASE
+    backoff_max: float = DEFAULT_BACKOFF_MAX
+    retry_statuses: frozenset = field(default=RETRY_STATUSES)
+
+    def backoff(self, attempt: int) -> float:
+        """第attempt次重试前的等待时间，使用完全随机抖动避免多个客户端同时重试"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def should_retry(self, method: str, attempt: int, error: Exception = None, status: int = None) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if error is not None:
+            if isinstance(error, CircuitOpenError):
+                return False
+            if method.upper() in IDEMPOTENT_METHODS:
+                return isinstance(error, requests.RequestException)
+            return is_connect_error(error)
+        return method.upper() in IDEMPOTENT_METHODS and status in self.retry_statuses
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败达到阈值后进入熔断状态，期间请求直接失败而不等待连接超时；
+    熔断recovery_timeout秒后放行一个探测请求，成功则恢复，失败则继续熔断
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 recovery_timeout: float = DEFAULT_RECOVERY_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def before_request(self):
+        """请求前检查，熔断中抛出CircuitOpenError"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            remaining = self.recovery_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(f'面板暂时不可用，{remaining:.0f}秒后重试')
+            if self._probing:
+                raise CircuitOpenError('面板暂时不可用，正在检测是否恢复')
+            self._state = self.HALF_OPEN
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def reset(self):
+        self.record_success()
+
+class PanelGuard:
+    """同一面板地址的所有调用方共享的熔断器和限流器"""
+
+    def __init__(self, panel_url: str, rate: float = DEFAULT_PANEL_RATE, burst: float = DEFAULT_PANEL_BURST,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 recovery_timeout: float = DEFAULT_RECOVERY_TIMEOUT,
+                 acquire_timeout: float = DEFAULT_ACQUIRE_TIMEOUT):
+        self.panel_url = panel_url
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self.acquire_timeout = acquire_timeout
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: float, burst: float = None):
+        """设置每秒最多请求数，rate为None时不限流"""
+        self.rate_limiter = TokenBucket(rate, burst) if rate else None
+
+    def execute(self, method: str, send, policy: RetryPolicy):
+        """按重试策略执行send()，返回requests的响应
+
+        状态码不可重试或重试次数用尽时原样返回最后一个响应，由调用方处理
+        """
+        method = method.upper()
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None and not self.rate_limiter.acquire(timeout=self.acquire_timeout):
+                raise RateLimitTimeout('请求过于频繁，等待限流超时')
+            self.breaker.before_request()
+            try:
+                response = send()
+            except requests.RequestException as e:
+                self.breaker.record_failure()
+                if not policy.should_retry(method, attempt, error=e):
+                    raise
+                self._wait(method, attempt, policy, type(e).__name__)
+                attempt += 1
+                continue
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            if response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            if not policy.should_retry(method, attempt, status=response.status_code):
+                return response
+            response.close()
+            self._wait(method, attempt, policy, str(response.status_code))
+            attempt += 1
+
+    def _wait(self, method: str, attempt: int, policy: RetryPolicy, reason: str):
+        instrumentation.count('panel_retry', panel=self.panel_url, method=method, reason=reason)
+        time.sleep(policy.backoff(attempt))
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+def get_panel_guard(panel_url: str, **options) -> PanelGuard:
+    """获取面板地址对应的共享PanelGuard，options只在首次创建时生效"""
+    key = panel_url.rstrip('/')
+    with _guards_lock:
+        guard = _guards.get(key)
+        if guard is None:
+            guard = _guards[key] = PanelGuard(key, **options)
+        return guard
+
+def reset_panel_guards():
+    """丢弃所有面板的熔断和限流状态"""
+    with _guards_lock:
+        _guards.clear()
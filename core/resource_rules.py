@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+from dataclasses import dataclass, field
+
+MODE_BLOCKLIST = 'blocklist'
+MODE_ALLOWLIST = 'allowlist'
+
+# 规则文件名，位于数据目录下，不存在时使用默认规则
+RULES_FILE_NAME = 'resource_rules.json'
+
+# 登录只需要页面、脚本、样式和接口请求，以下类型默认拦截
+DEFAULT_BLOCKED_TYPES = ['Image', 'Media', 'FontResource', 'Favicon', 'Object', 'Ping', 'CspReport', 'Prefetch']
+# 第三方统计、广告和前端监控域名（包括子域名）
+DEFAULT_BLOCKED_HOSTS = [
+    'doubleclick.net',
+    'googlesyndication.com',
+    'google-analytics.com',
+    'googletagmanager.com',
+    'hm.baidu.com',
+    'cnzz.com',
+    'umeng.com',
+    'growingio.com',
+    'wlmonitor.m.jd.com',
+    'sgm-m.jd.com',
+]
+# 白名单模式下允许访问的域名
+DEFAULT_ALLOWED_HOSTS = ['jd.com', '360buyimg.com', 'jdpay.com', 'jcloud.com']
+# 登录页面发起的请求不做任何拦截，保证滑块验证码等图片正常显示
+DEFAULT_LOGIN_HOSTS = ['plogin.m.jd.com', 'passport.m.jd.com', 'jcap.m.jd.com']
+
+def _match_host(host: str, patterns) -> str:
+    """host等于某个域名或是其子域名时返回该域名"""
+    for pattern in patterns:
+        if host == pattern or host.endswith('.' + pattern):
+            return pattern
+    return ''
+
+@dataclass
+class ResourceRules:
+    """WebView请求过滤规则
+
+    blocklist模式拦截blocked_types类型和blocked_hosts域名的请求；
+    allowlist模式只允许allowed_hosts域名，同时仍拦截blocked_types类型。
+    主框架导航和登录页面发起的请求始终放行
+    """
+    enabled: bool = True
+    mode: str = MODE_BLOCKLIST
+    blocked_types: list = field(default_factory=lambda: list(DEFAULT_BLOCKED_TYPES))
+    blocked_hosts: list = field(default_factory=lambda: list(DEFAULT_BLOCKED_HOSTS))
+    allowed_hosts: list = field(default_factory=lambda: list(DEFAULT_ALLOWED_HOSTS))
+    login_hosts: list = field(default_factory=lambda: list(DEFAULT_LOGIN_HOSTS))
+
+    @classmethod
+    def load(cls, path: str = None):
+        """从JSON文件读取规则，未指定路径时读取数据目录下的resource_rules.json"""
+        if path is None:
+            from database.storage import get_data_dir
+            path = os.path.join(get_data_dir(), RULES_FILE_NAME)
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            rules = cls(**{key: value for key, value in data.items() if key in cls.__dataclass_fields__})
+            if rules.mode not in (MODE_BLOCKLIST, MODE_ALLOWLIST):
+                raise Exception(f'未知的过滤模式: {rules.mode}')
+            return rules
+        except Exception as e:
+            print(f"加载请求过滤规则失败，使用默认规则: {str(e)}")
+            return cls()
+
+    def decide(self, host: str, resource_type: str, first_party_host: str = '', main_frame: bool = False) -> str:
+        """判断是否拦截请求，返回拦截原因，放行时返回空字符串
+
+        resource_type为QWebEngineUrlRequestInfo.ResourceType去掉ResourceType前缀的名称，如Image
+        """
+        if not self.enabled or main_frame:
+            return ''
+        host = host.lower()
+        if first_party_host and _match_host(first_party_host.lower(), self.login_hosts):
+            return ''
+        if self.mode == MODE_ALLOWLIST:
+            if not _match_host(host, self.allowed_hosts):
+                return 'host'
+        elif _match_host(host, self.blocked_hosts):
+            return 'host'
+        if resource_type in self.blocked_types:
+            return 'type'
+        return ''
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+
+class StartupTimeline:
+    """启动阶段计时，记录从进程启动到各阶段完成的耗时"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []
+
+    def mark(self, phase: str):
+        """记录一个阶段完成的时间点"""
+        self.marks.append((phase, time.perf_counter() - self.start))
+
+    def as_dict(self) -> dict:
+        """各阶段完成时的累计耗时（毫秒）"""
+        return {phase: round(elapsed * 1000, 1) for phase, elapsed in self.marks}
+
+    def report(self) -> str:
+        """生成启动耗时报告"""
+        lines = ['启动耗时：']
+        previous = 0.0
+        for phase, elapsed in self.marks:
+            lines.append(f"  {phase:<20} +{(elapsed - previous) * 1000:8.1f} ms  累计 {elapsed * 1000:8.1f} ms")
+            previous = elapsed
+        return '\n'.join(lines)
+
+    def is_report_enabled(self) -> bool:
+        """通过 --startup-report 参数或 JD_HELPER_STARTUP_REPORT 环境变量开启报告"""
+        return '--startup-report' in sys.argv or bool(os.environ.get('JD_HELPER_STARTUP_REPORT'))
+
+# 进程内共享的启动计时，应尽早导入以便从导入阶段开始计时
+timeline = StartupTimeline()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+# 距离过期多久开始后台刷新token（秒）
+DEFAULT_REFRESH_MARGIN = 3600
+
+class TokenManager:
+    """青龙面板token生命周期管理
+
+    记录token过期时间，临近过期时在后台提前刷新，已过期或被面板拒绝时同步刷新；
+    并发调用方共享同一次刷新，不会重复请求/open/auth/token
+    """
+
+    def __init__(self, fetch_token, on_refreshed=None, refresh_margin: float = DEFAULT_REFRESH_MARGIN):
+        # fetch_token() 返回 (token, 过期时间戳)，过期时间未知时为None
+        self.fetch_token = fetch_token
+        self.on_refreshed = on_refreshed
+        self.refresh_margin = refresh_margin
+        self.token = None
+        self.expires_at = None
+        self._refresh_lock = threading.Lock()
+        self._background_lock = threading.Lock()
+        self._background = None
+
+    def set_token(self, token: str, expires_at: float = None):
+        """设置当前token及其过期时间"""
+        self.token = token
+        self.expires_at = expires_at
+
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+    def needs_refresh(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at - self.refresh_margin
+
+    def get_token(self) -> str:
+        """获取可用的token，必要时刷新"""
+        if self.token is None or self.is_expired():
+            return self.refresh(self.token)
+        if self.needs_refresh():
+            self._refresh_in_background()
+        return self.token
+
+    def refresh(self, stale_token: str = None) -> str:
+        """刷新token
+
+        stale_token为调用方手中已失效的token，若其他调用方已经换成新token则直接复用
+        """
+        with self._refresh_lock:
+            if self.token is not None and self.token != stale_token and not self.is_expired():
+                return self.token
+            token, expires_at = self.fetch_token()
+            self.set_token(token, expires_at)
+            if self.on_refreshed:
+                self.on_refreshed(token, expires_at)
+            return token
+
+    def _refresh_in_background(self):
+        with self._background_lock:
+            if self._refresh_lock.locked() or (self._background and self._background.is_alive()):
+                return
+            self._background = threading.Thread(target=self._background_refresh, args=(self.token,), daemon=True)
+            self._background.start()
+
+    def _background_refresh(self, stale_token: str):
+        try:
+            self.refresh(stale_token)
+        except Exception as e:
+            print(f"后台刷新token失败: {str(e)}")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from PyQt6.QtWebEngineCore import QWebEngineProfile
+from database.storage import get_data_dir
+
+# 登录Profile的名称，同名Profile共用同一个存储目录
+LOGIN_PROFILE_NAME = 'jd_login'
+# 存储目录名，位于数据库所在的数据目录下
+PROFILE_DIR_NAME = 'web_profile'
+# HTTP磁盘缓存上限（字节）
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+# Chromium保存持久Cookie的文件名
+COOKIES_FILE_NAME = 'Cookies'
+
+def get_profile_dir() -> str:
+    """登录Profile的存储目录：默认为<数据目录>/web_profile，可通过JD_HELPER_WEB_PROFILE环境变量指定"""
+    profile_dir = os.environ.get('JD_HELPER_WEB_PROFILE') or os.path.join(get_data_dir(), PROFILE_DIR_NAME)
+    os.makedirs(profile_dir, exist_ok=True)
+    return profile_dir
+
+def get_cache_size() -> int:
+    """磁盘缓存上限，可通过JD_HELPER_WEB_CACHE_MB环境变量指定（单位MB）"""
+    try:
+        return int(float(os.environ['JD_HELPER_WEB_CACHE_MB']) * 1024 * 1024)
+    except (KeyError, ValueError):
+        return DEFAULT_CACHE_SIZE
+
+def create_login_profile(parent=None, profile_dir: str = None, cache_size: int = None) -> QWebEngineProfile:
+    """创建持久化的登录Profile
+
+    页面资源缓存在磁盘上，再次启动时直接从缓存渲染；
+    Cookie强制持久化（包括会话Cookie），启动时无需从数据库回放
+    """
+    profile_dir = profile_dir or get_profile_dir()
+    profile = QWebEngineProfile(LOGIN_PROFILE_NAME, parent)
+    profile.setPersistentStoragePath(profile_dir)
+    profile.setCachePath(os.path.join(profile_dir, 'cache'))
+    profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
+    profile.setHttpCacheMaximumSize(cache_size or get_cache_size())
+    profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies)
+    return profile
+
+def has_persistent_cookies(profile: QWebEngineProfile) -> bool:
+    """Profile的存储目录中是否已经保存过Cookie"""
+    if profile.isOffTheRecord():
+        return False
+    return os.path.exists(os.path.join(profile.persistentStoragePath(), COOKIES_FILE_NAME))
+
+def directory_size(path: str) -> int:
+    """目录下所有文件的总大小（字节），目录不存在时为0"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                # 缓存文件可能在统计过程中被Chromium删除
+                pass
+    return total
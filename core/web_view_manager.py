@@ -1,28 +1,170 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import time
 from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtCore import QUrl
+from PyQt6.QtWebEngineCore import QWebEnginePage
+from PyQt6.QtCore import QUrl, QTimer
+from core.instrumentation import instrumentation
+from core.memory_usage import process_rss
+
+HOME_URL = 'https://m.jd.com'
+# 低内存模式：登录后释放页面。blank为跳转到空白页或丢弃页面，teardown为销毁页面
+LOW_MEMORY_OFF = ''
+LOW_MEMORY_BLANK = 'blank'
+LOW_MEMORY_TEARDOWN = 'teardown'
+# 释放页面后等待渲染进程退出再统计内存（毫秒）
+MEMORY_REPORT_DELAY_MS = 3000
+
+# 统计页面及其资源的请求数、传输字节数、解码后字节数和命中缓存的请求数
+# transferSize为0而decodedBodySize大于0的请求来自HTTP缓存
+PAGE_STATS_SCRIPT = """
+(function() {
+    var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+    var transfer = 0, decoded = 0, cached = 0;
+    for (var i = 0; i < entries.length; i++) {
+        transfer += entries[i].transferSize || 0;
+        decoded += entries[i].decodedBodySize || 0;
+        if (!entries[i].transferSize && entries[i].decodedBodySize) {
+            cached += 1;
+        }
+    }
+    return [entries.length, transfer, decoded, cached];
+})()
+"""
+
+def get_low_memory_mode() -> str:
+    """通过JD_HELPER_LOW_MEMORY环境变量开启低内存模式：1或blank、teardown"""
+    mode = os.environ.get('JD_HELPER_LOW_MEMORY', '').strip().lower()
+    if mode in ('', '0', 'false', 'off'):
+        return LOW_MEMORY_OFF
+    return LOW_MEMORY_TEARDOWN if mode == LOW_MEMORY_TEARDOWN else LOW_MEMORY_BLANK
 
 class WebViewManager:
-    def __init__(self):
+    def __init__(self, profile=None, filtered: bool = False):
+        """filtered表示Profile是否安装了请求过滤，只用于区分加载耗时统计"""
         self.web_view = QWebEngineView()
+        if profile is not None:
+            # 页面使用指定的Profile，各账号的Cookie互相隔离
+            self.web_view.setPage(QWebEnginePage(profile, self.web_view))
+        self.filtered = filtered
+        # 最近一次页面加载的耗时和传输量
+        self.load_stats = {}
+        # 页面释放前后的内存统计，见suspend
+        self.memory_report = {}
+        self.suspended = False
+        self.restore_url = QUrl(HOME_URL)
+        self._load_started_at = None
+        self.web_view.loadStarted.connect(self._on_load_started)
+        self.web_view.loadFinished.connect(self._on_load_finished)
         self.init_web_view()
     
     def init_web_view(self):
         """初始化WebView"""
-        self.web_view.setUrl(QUrl('https://m.jd.com'))
+        self.web_view.setUrl(QUrl(HOME_URL))
+    
+    def _on_load_started(self):
+        self._load_started_at = time.perf_counter()
+    
+    def _on_load_finished(self, ok):
+        if self._load_started_at is None:
+            return
+        elapsed = time.perf_counter() - self._load_started_at
+        self._load_started_at = None
+        labels = {'filtered': 'yes' if self.filtered else 'no'}
+        instrumentation.observe('page_load', elapsed, ok=str(bool(ok)).lower(), **labels)
+        self.load_stats = {'url': self.web_view.url().toString(), 'ok': ok, 'elapsed': elapsed}
+        
+        def on_stats(result):
+            if not result:
+                return
+            count, transfer, decoded, cached = (int(value) for value in result)
+            self.load_stats.update(
+                resources=count, transfer_bytes=transfer, decoded_bytes=decoded,
+                cache_hits=cached, cache_hit_rate=cached / count if count else 0.0
+            )
+            instrumentation.count('page_resources', count, **labels)
+            instrumentation.count('page_cache_hits', cached, **labels)
+            instrumentation.count('page_transfer_bytes', transfer, **labels)
+        
+        self.web_view.page().runJavaScript(PAGE_STATS_SCRIPT, 0, on_stats)
     
     def get_web_view(self) -> QWebEngineView:
         """获取WebView实例"""
         return self.web_view
     
+    def _renderer_pids(self) -> set:
+        pid = self.web_view.page().renderProcessPid()
+        return {pid} if pid else set()
+    
+    def memory_usage(self, renderer_pids: set = None) -> dict:
+        """主进程和渲染进程的常驻内存（字节），已退出的进程计为0"""
+        renderer_pids = self._renderer_pids() if renderer_pids is None else renderer_pids
+        return {
+            'main': process_rss(),
+            'renderer': sum(process_rss(pid) for pid in renderer_pids),
+        }
+    
+    def suspend(self, teardown: bool = False):
+        """释放页面占用的渲染进程，之后由restore重新加载"""
+        if self.suspended:
+            return
+        self.suspended = True
+        page = self.web_view.page()
+        url = self.web_view.url()
+        if url.isValid() and url.scheme().startswith('http'):
+            self.restore_url = url
+        renderer_pids = self._renderer_pids()
+        before = self.memory_usage(renderer_pids)
+        if teardown:
+            # 换成一个还未加载内容的新页面，旧页面删除后渲染进程随之退出
+            self.web_view.setPage(QWebEnginePage(page.profile(), self.web_view))
+            page.deleteLater()
+        elif not page.isVisible():
+            # 不可见的页面直接丢弃，再次激活时自动重新加载
+            page.setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+        else:
+            self.web_view.setUrl(QUrl('about:blank'))
+        # 定时器挂在WebView下，会话关闭后不再触发
+        timer = QTimer(self.web_view)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda: self._report_memory(before, renderer_pids))
+        timer.timeout.connect(timer.deleteLater)
+        timer.start(MEMORY_REPORT_DELAY_MS)
+    
+    def _report_memory(self, before: dict, renderer_pids: set):
+        after = self.memory_usage(renderer_pids | self._renderer_pids())
+        released = sum(before.values()) - sum(after.values())
+        self.memory_report = {'before': before, 'after': after, 'released': released}
+        # 释放前后各进程的内存在“运行统计”窗口中按process和phase区分显示
+        for process in ('main', 'renderer'):
+            instrumentation.count('page_memory_bytes', before[process], process=process, phase='before')
+            instrumentation.count('page_memory_bytes', after[process], process=process, phase='after')
+        instrumentation.count('page_released_bytes', max(released, 0))
+    
+    def restore(self):
+        """重新加载suspend释放的页面"""
+        if not self.suspended:
+            return
+        self.suspended = False
+        page = self.web_view.page()
+        if page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded:
+            # 丢弃的页面激活后自动重新加载原来的URL
+            page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        else:
+            self.web_view.setUrl(self.restore_url)
+    
     def reload_page(self):
-        """刷新当前页面"""
-        self.web_view.reload()
+        """刷新当前页面，页面已释放时重新加载"""
+        if self.suspended:
+            self.restore()
+        else:
+            self.web_view.reload()
     
     def load_url(self, url: str):
         """加载指定URL"""
+        self.suspended = False
         self.web_view.setUrl(QUrl(url))
     
     def go_back(self):
@@ -35,4 +177,4 @@ class WebViewManager:
     
     def stop_loading(self):
         """停止加载"""
-        self.web_view.stop()
\ No newline at end of file
+        self.web_view.stop()
@@ -6,5 +6,7 @@
 """
 
 from .models import init_db
+from .storage import Storage, get_storage, close_storage
+from .retention import CookieRetention, RetentionReport
 
-__all__ = ['init_db']
\ No newline at end of file
+__all__ = ['init_db', 'Storage', 'get_storage', 'close_storage', 'CookieRetention', 'RetentionReport']
\ No newline at end of file
@@ -1,8 +1,6 @@
 from dataclasses import dataclass
 from datetime import datetime
 import sqlite3
-import json
-import os
 
 @dataclass
 class QinglongConfig:
@@ -16,8 +14,7 @@ class QinglongConfig:
 
     @staticmethod
     def create_table(conn: sqlite3.Connection):
-        cursor = conn.cursor()
-        cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS qinglong_config (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             panel_url TEXT NOT NULL,
@@ -28,7 +25,6 @@ class QinglongConfig:
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         """)
-        conn.commit()
 
 @dataclass
 class JdCookie:
@@ -41,8 +37,7 @@ class JdCookie:
 
     @staticmethod
     def create_table(conn: sqlite3.Connection):
-        cursor = conn.cursor()
-        cursor.execute("""
+        conn.execute("""
         CREATE TABLE IF NOT EXISTS jd_cookie (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_pin TEXT NOT NULL,
@@ -52,18 +47,83 @@ class JdCookie:
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
         """)
-        conn.commit()
+
+@dataclass
+class JdCookieHistory:
+    id: int
+    user_pin: str
+    cookie: str
+    captured_at: datetime  # 被替换的Cookie最后一次更新的时间
+
+    @staticmethod
+    def create_table(conn: sqlite3.Connection):
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS jd_cookie_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_pin TEXT NOT NULL,
+            cookie TEXT NOT NULL,
+            captured_at TIMESTAMP NOT NULL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jd_cookie_history_user_pin ON jd_cookie_history (user_pin, id)")
+
+@dataclass
+class JdCookieArchive:
+    id: int
+    user_pin: str
+    version_count: int
+    first_captured_at: datetime
+    last_captured_at: datetime
+    data: bytes  # zlib压缩的JSON：[{"cookie": ..., "captured_at": ...}]
+    created_at: datetime
+
+    @staticmethod
+    def create_table(conn: sqlite3.Connection):
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS jd_cookie_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_pin TEXT NOT NULL,
+            version_count INTEGER NOT NULL,
+            first_captured_at TIMESTAMP,
+            last_captured_at TIMESTAMP,
+            data BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jd_cookie_archive_user_pin ON jd_cookie_archive (user_pin)")
+
+@dataclass
+class JdCookieItem:
+    id: int
+    user_pin: str
+    name: str
+    value: str
+    domain: str
+    path: str
+    expires_at: float  # Unix时间戳，会话Cookie为NULL
+    captured_at: float  # 值最近一次变化的时间
+
+    @staticmethod
+    def create_table(conn: sqlite3.Connection):
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS jd_cookie_item (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_pin TEXT NOT NULL,
+            name TEXT NOT NULL,
+            value TEXT NOT NULL,
+            domain TEXT NOT NULL DEFAULT '.jd.com',
+            path TEXT NOT NULL DEFAULT '/',
+            expires_at REAL,
+            captured_at REAL
+        )
+        """)
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_jd_cookie_item_key ON jd_cookie_item (user_pin, name, domain, path)"
+        )
+        # 按Cookie名称和过期时间查询即将过期的账号
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jd_cookie_item_expires ON jd_cookie_item (name, expires_at)")
 
 def init_db():
-    """初始化数据库连接和表结构"""
-    # 获取用户文档目录路径
-    docs_path = os.path.expanduser('~/Documents')
-    # 创建jd_helper目录
-    db_dir = os.path.join(docs_path, 'jd_helper')
-    os.makedirs(db_dir, exist_ok=True)
-    # 设置数据库文件路径
-    db_path = os.path.join(db_dir, 'jd_helper.db')
-    conn = sqlite3.connect(db_path)
-    QinglongConfig.create_table(conn)
-    JdCookie.create_table(conn)
-    return conn
\ No newline at end of file
+    """获取共享的数据库连接，表结构由storage模块的迁移创建和升级"""
+    from database.storage import get_storage
+    return get_storage().conn
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+import zlib
+from dataclasses import dataclass
+from database.storage import get_storage, Storage
+
+# 每个账号在历史表中保留的旧版本数
+DEFAULT_KEEP_VERSIONS = 5
+# VACUUM和ANALYZE的最短间隔（秒）
+DEFAULT_MAINTENANCE_INTERVAL = 7 * 86400
+# 上次执行VACUUM的时间戳在meta表中的键
+LAST_VACUUM_KEY = 'last_vacuum_at'
+
+@dataclass
+class RetentionReport:
+    """一次维护的结果，大小单位为字节"""
+    archived_versions: int = 0
+    dropped_versions: int = 0
+    vacuumed: bool = False
+    size_before: int = 0
+    size_after: int = 0
+    file_size_before: int = 0
+    file_size_after: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        """释放的磁盘空间"""
+        return max(self.file_size_before - self.file_size_after, 0)
+
+    def as_dict(self) -> dict:
+        return {
+            'archived_versions': self.archived_versions,
+            'dropped_versions': self.dropped_versions,
+            'vacuumed': self.vacuumed,
+            'size_before': self.size_before,
+            'size_after': self.size_after,
+            'file_size_before': self.file_size_before,
+            'file_size_after': self.file_size_after,
+            'reclaimed_bytes': self.reclaimed_bytes,
+            'elapsed': round(self.elapsed, 3),
+        }
+
+class CookieRetention:
+    """jd_cookie历史版本的保留和压缩
+
+    jd_cookie每个账号只保留最新一行，被替换的旧Cookie由触发器写入jd_cookie_history；
+    历史表中每个账号只保留最近keep_versions个版本，更早的版本压缩存入jd_cookie_archive，
+    archive为False时直接删除。数据库按maintenance_interval定期执行VACUUM和ANALYZE
+    """
+
+    def __init__(self, storage: Storage = None, keep_versions: int = DEFAULT_KEEP_VERSIONS,
+                 archive: bool = True, maintenance_interval: float = DEFAULT_MAINTENANCE_INTERVAL):
+        self.storage = storage or get_storage()
+        self.keep_versions = keep_versions
+        self.archive = archive
+        self.maintenance_interval = maintenance_interval
+
+    def history(self, user_pin: str) -> list:
+        """历史表中账号的旧版本：[(cookie, captured_at)]，最近的在前"""
+        return self.storage.fetchall(
+            "SELECT cookie, captured_at FROM jd_cookie_history WHERE user_pin = ? ORDER BY id DESC",
+            (user_pin,)
+        )
+
+    def archived_versions(self, user_pin: str) -> list:
+        """解压账号已归档的版本：[(cookie, captured_at)]，最近的在前"""
+        versions = []
+        rows = self.storage.fetchall(
+            "SELECT data FROM jd_cookie_archive WHERE user_pin = ? ORDER BY id DESC", (user_pin,)
+        )
+        for (data,) in rows:
+            items = json.loads(zlib.decompress(data).decode('utf-8'))
+            versions.extend((item['cookie'], item['captured_at']) for item in reversed(items))
+        return versions
+
+    def compact(self):
+        """压缩或删除超出保留数量的历史版本，返回(归档数, 删除数)"""
+        archived = dropped = 0
+        with self.storage.transaction('compact_history') as conn:
+            pins = conn.execute(
+                "SELECT user_pin FROM jd_cookie_history GROUP BY user_pin HAVING COUNT(*) > ?",
+                (self.keep_versions,)
+            ).fetchall()
+            for (user_pin,) in pins:
+                rows = conn.execute(
+                    "SELECT id, cookie, captured_at FROM jd_cookie_history WHERE user_pin = ? "
+                    "ORDER BY id DESC LIMIT -1 OFFSET ?",
+                    (user_pin, self.keep_versions)
+                ).fetchall()
+                if not rows:
+                    continue
+                rows.reverse()
+                if self.archive:
+                    data = json.dumps(
+                        [{'cookie': cookie, 'captured_at': captured_at} for _, cookie, captured_at in rows],
+                        ensure_ascii=False, separators=(',', ':')
+                    ).encode('utf-8')
+                    conn.execute(
+                        "INSERT INTO jd_cookie_archive (user_pin, version_count, first_captured_at, "
+                        "last_captured_at, data) VALUES (?, ?, ?, ?, ?)",
+                        (user_pin, len(rows), rows[0][2], rows[-1][2], zlib.compress(data, 9))
+                    )
+                    archived += len(rows)
+                else:
+                    dropped += len(rows)
+                conn.execute(
+                    "DELETE FROM jd_cookie_history WHERE user_pin = ? AND id <= ?",
+                    (user_pin, rows[-1][0])
+                )
+        return archived, dropped
+
+    def is_maintenance_due(self) -> bool:
+        last_run = float(self.storage.get_meta(LAST_VACUUM_KEY, '0') or 0)
+        return time.time() - last_run >= self.maintenance_interval
+
+    def run(self, force: bool = False) -> RetentionReport:
+        """执行一次维护：压缩历史版本，到期（或force）时执行VACUUM和ANALYZE"""
+        start = time.perf_counter()
+        report = RetentionReport(
+            size_before=self.storage.database_size(),
+            file_size_before=self.storage.file_size()
+        )
+        report.archived_versions, report.dropped_versions = self.compact()
+        if force or self.is_maintenance_due():
+            self.storage.vacuum()
+            self.storage.analyze()
+            self.storage.set_meta(LAST_VACUUM_KEY, str(time.time()))
+            report.vacuumed = True
+        report.size_after = self.storage.database_size()
+        report.file_size_after = self.storage.file_size()
+        report.elapsed = time.perf_counter() - start
+        return report
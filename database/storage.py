@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from database.models import QinglongConfig, JdCookie, JdCookieHistory, JdCookieArchive, JdCookieItem
+from core.instrumentation import instrumentation
+from core.cookie_utils import parse_cookie_str
+
+# 写入账号Cookie，同一账号只保留一行，Cookie内容变化时更新获取时间
+_UPSERT_COOKIE_SQL = (
+    "INSERT INTO jd_cookie (user_pin, cookie, status, captured_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(user_pin) DO UPDATE SET cookie = excluded.cookie, "
+    "status = excluded.status, updated_at = CURRENT_TIMESTAMP, "
+    "captured_at = CASE WHEN jd_cookie.cookie <> excluded.cookie OR jd_cookie.captured_at IS NULL "
+    "THEN excluded.captured_at ELSE jd_cookie.captured_at END"
+)
+# 写入单个Cookie项，值不变且新的过期时间未知时保留原来的过期时间
+_UPSERT_COOKIE_ITEM_SQL = (
+    "INSERT INTO jd_cookie_item (user_pin, name, value, domain, path, expires_at, captured_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_pin, name, domain, path) DO UPDATE SET value = excluded.value, "
+    "expires_at = COALESCE(excluded.expires_at, "
+    "CASE WHEN jd_cookie_item.value = excluded.value THEN jd_cookie_item.expires_at END), "
+    "captured_at = CASE WHEN jd_cookie_item.value <> excluded.value "
+    "THEN excluded.captured_at ELSE jd_cookie_item.captured_at END"
+)
+# 从Cookie字符串得到的Cookie项没有域名和过期时间，使用京东的主域名
+DEFAULT_COOKIE_DOMAIN = '.jd.com'
+DEFAULT_COOKIE_PATH = '/'
+
+def get_data_dir():
+    """数据目录：默认为~/Documents/jd_helper，可通过JD_HELPER_HOME环境变量指定"""
+    data_dir = os.environ.get('JD_HELPER_HOME')
+    if not data_dir:
+        # 获取用户文档目录路径
+        docs_path = os.path.expanduser('~/Documents')
+        data_dir = os.path.join(docs_path, 'jd_helper')
+    # 创建jd_helper目录
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+def get_db_path():
+    """数据库文件路径：<数据目录>/jd_helper.db"""
+    return os.path.join(get_data_dir(), 'jd_helper.db')
+
+def _migrate_create_tables(conn: sqlite3.Connection):
+    QinglongConfig.create_table(conn)
+    JdCookie.create_table(conn)
+
+def _migrate_unique_indexes(conn: sqlite3.Connection):
+    # 旧版本每次事件都会追加一行，只保留每个账号/面板最新的一行
+    conn.execute("""
+    DELETE FROM jd_cookie WHERE id NOT IN (
+        SELECT MAX(id) FROM jd_cookie GROUP BY user_pin
+    )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jd_cookie_user_pin ON jd_cookie (user_pin)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jd_cookie_status ON jd_cookie (status)")
+    conn.execute("""
+    DELETE FROM qinglong_config WHERE id NOT IN (
+        SELECT MAX(id) FROM qinglong_config GROUP BY panel_url
+    )
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_qinglong_config_panel_url ON qinglong_config (panel_url)")
+    conn.execute("ALTER TABLE qinglong_config ADD COLUMN token_expires_at REAL")
+
+def _migrate_cookie_history(conn: sqlite3.Connection):
+    JdCookieHistory.create_table(conn)
+    JdCookieArchive.create_table(conn)
+    # Cookie内容变化时由触发器把旧版本写入历史表，所有写入路径都不需要额外处理
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_jd_cookie_history AFTER UPDATE OF cookie ON jd_cookie
+    WHEN old.cookie <> new.cookie
+    BEGIN
+        INSERT INTO jd_cookie_history (user_pin, cookie, captured_at) VALUES (old.user_pin, old.cookie, old.updated_at);
+    END
+    """)
+    # 键值表，记录维护任务的上次执行时间等
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    # load_active_cookie按状态筛选后按更新时间排序
+    conn.execute("DROP INDEX IF EXISTS idx_jd_cookie_status")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jd_cookie_status_updated_at ON jd_cookie (status, updated_at)")
+
+def _migrate_refresh_times(conn: sqlite3.Connection):
+    # 记录Cookie的获取、同步和检测时间（Unix时间戳），供定时刷新使用
+    conn.execute("ALTER TABLE jd_cookie ADD COLUMN captured_at REAL")
+    conn.execute("ALTER TABLE jd_cookie ADD COLUMN synced_at REAL")
+    conn.execute("ALTER TABLE jd_cookie ADD COLUMN checked_at REAL")
+    # 已有账号以最后更新时间作为获取时间
+    conn.execute("UPDATE jd_cookie SET captured_at = CAST(strftime('%s', updated_at) AS REAL)")
+
+def _items_from_cookie_str(cookie: str) -> list:
+    """把Cookie字符串拆分为(name, value, domain, path, expires_at)列表"""
+    return [
+        (name, value, DEFAULT_COOKIE_DOMAIN, DEFAULT_COOKIE_PATH, None)
+        for name, value in parse_cookie_str(cookie).items()
+    ]
+
+def _migrate_cookie_items(conn: sqlite3.Connection):
+    # 每个Cookie单独保存一行，记录域名、路径和过期时间
+    JdCookieItem.create_table(conn)
+    rows = conn.execute("SELECT user_pin, cookie, captured_at FROM jd_cookie").fetchall()
+    conn.executemany(_UPSERT_COOKIE_ITEM_SQL, [
+        (user_pin, *item, captured_at)
+        for user_pin, cookie, captured_at in rows
+        for item in _items_from_cookie_str(cookie)
+    ])
+
+# 按顺序执行的结构迁移，数据库版本号记录在PRAGMA user_version中
+MIGRATIONS = [
+    _migrate_create_tables,
+    _migrate_unique_indexes,
+    _migrate_cookie_history,
+    _migrate_refresh_times,
+    _migrate_cookie_items,
+]
+
+class Storage:
+    """共享的SQLite存储
+
+    整个程序只使用一个WAL模式的连接，所有读写都通过同一把锁串行化，
+    SQL语句使用固定文本以命中sqlite3的预编译语句缓存
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=256)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.migrate()
+
+    def migrate(self):
+        """执行尚未应用的结构迁移"""
+        with self.lock:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            for index in range(version, len(MIGRATIONS)):
+                # sqlite3不会为ALTER TABLE等DDL语句自动开启事务，显式开启后迁移和版本号一起提交或回滚
+                self.conn.execute("BEGIN")
+                try:
+                    MIGRATIONS[index](self.conn)
+                    self.conn.execute(f"PRAGMA user_version = {index + 1}")
+                except Exception:
+                    self.conn.rollback()
+                    raise
+                self.conn.commit()
+
+    @contextmanager
+    def transaction(self, op: str = 'transaction'):
+        """在单个事务中执行多条写入，op为埋点中的操作名称"""
+        with instrumentation.timer('storage_write', op=op):
+            with self.lock:
+                with self.conn:
+                    yield self.conn
+
+    def fetchone(self, sql: str, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def fetchall(self, sql: str, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # 键值配置
+
+    def get_meta(self, key: str, default: str = None):
+        result = self.fetchone("SELECT value FROM meta WHERE key = ?", (key,))
+        return result[0] if result else default
+
+    def set_meta(self, key: str, value: str):
+        with self.transaction('set_meta') as conn:
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def database_size(self) -> int:
+        """数据库占用的字节数（不含空闲页）"""
+        with self.lock:
+            page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - freelist_count) * page_size
+
+    def file_size(self) -> int:
+        """数据库文件和WAL文件的总大小"""
+        size = 0
+        for path in (self.db_path, f'{self.db_path}-wal'):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return size
+
+    def vacuum(self):
+        """重建数据库文件释放空闲页，并截断WAL文件"""
+        with instrumentation.timer('storage_write', op='vacuum'):
+            with self.lock:
+                self.conn.execute("VACUUM")
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def analyze(self):
+        """更新查询优化器使用的统计信息"""
+        with instrumentation.timer('storage_write', op='analyze'):
+            with self.lock:
+                self.conn.execute("ANALYZE")
+
+    # 青龙面板配置
+
+    def load_config(self):
+        """获取最近保存的面板配置：(panel_url, client_id, client_secret, token, token_expires_at)"""
+        return self.fetchone(
+            "SELECT panel_url, client_id, client_secret, token, token_expires_at FROM qinglong_config "
+            "ORDER BY updated_at DESC, id DESC LIMIT 1"
+        )
+
+    def load_configs(self):
+        """获取所有面板配置，最近保存的在前"""
+        return self.fetchall(
+            "SELECT panel_url, client_id, client_secret, token, token_expires_at FROM qinglong_config "
+            "ORDER BY updated_at DESC, id DESC"
+        )
+
+    def delete_config(self, panel_url: str):
+        """删除面板配置"""
+        with self.transaction('delete_config') as conn:
+            conn.execute("DELETE FROM qinglong_config WHERE panel_url = ?", (panel_url,))
+
+    def save_config(self, panel_url: str, client_id: str, client_secret: str, token: str, token_expires_at: float = None):
+        """保存面板配置，同一面板地址只保留一行"""
+        with self.transaction('save_config') as conn:
+            conn.execute(
+                "INSERT INTO qinglong_config (panel_url, client_id, client_secret, token, token_expires_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(panel_url) DO UPDATE SET client_id = excluded.client_id, "
+                "client_secret = excluded.client_secret, token = excluded.token, "
+                "token_expires_at = excluded.token_expires_at, updated_at = CURRENT_TIMESTAMP",
+                (panel_url, client_id, client_secret, token, token_expires_at)
+            )
+
+    def update_token(self, panel_url: str, token: str, token_expires_at: float = None):
+        """更新面板token"""
+        with self.transaction('update_token') as conn:
+            conn.execute(
+                "UPDATE qinglong_config SET token = ?, token_expires_at = ? WHERE panel_url = ?",
+                (token, token_expires_at, panel_url)
+            )
+
+    # 京东Cookie
+
+    def upsert_cookie(self, user_pin: str, cookie: str, status: str = 'active'):
+        """写入账号Cookie，同一账号只保留一行，Cookie内容变化时更新获取时间"""
+        self.save_account_cookies(user_pin, cookie, status=status)
+
+    def save_account_cookies(self, user_pin: str, cookie: str, items: list = None, status: str = 'active'):
+        """在一个事务中写入账号的Cookie字符串和各个Cookie项
+
+        items为(name, value, domain, path, expires_at)列表，未指定时从Cookie字符串拆分
+        """
+        captured_at = time.time()
+        items = _items_from_cookie_str(cookie) if items is None else items
+        with self.transaction('upsert_cookie') as conn:
+            conn.execute(_UPSERT_COOKIE_SQL, (user_pin, cookie, status, captured_at))
+            conn.executemany(_UPSERT_COOKIE_ITEM_SQL, [(user_pin, *item, captured_at) for item in items])
+
+    def upsert_cookies(self, rows: list):
+        """在一个事务中批量写入账号Cookie，rows为(user_pin, cookie, status)列表"""
+        captured_at = time.time()
+        with self.transaction('upsert_cookies') as conn:
+            conn.executemany(
+                _UPSERT_COOKIE_SQL,
+                [(user_pin, cookie, status, captured_at) for user_pin, cookie, status in rows]
+            )
+            conn.executemany(_UPSERT_COOKIE_ITEM_SQL, [
+                (user_pin, *item, captured_at)
+                for user_pin, cookie, status in rows
+                for item in _items_from_cookie_str(cookie)
+            ])
+
+    def load_active_account(self):
+        """获取最近更新的有效账号：(user_pin, cookie)，没有时返回None"""
+        return self.fetchone(
+            "SELECT user_pin, cookie FROM jd_cookie WHERE status = 'active' ORDER BY updated_at DESC, id DESC LIMIT 1"
+        )
+
+    def load_cookie_items(self, user_pin: str) -> list:
+        """获取账号的各个Cookie项：[(name, value, domain, path, expires_at)]"""
+        return self.fetchall(
+            "SELECT name, value, domain, path, expires_at FROM jd_cookie_item WHERE user_pin = ? ORDER BY id",
+            (user_pin,)
+        )
+
+    def load_cookie_expiries(self, name: str = 'pt_key', status: str = 'active') -> dict:
+        """账号指定Cookie的过期时间：{user_pin: expires_at}，过期时间未知的账号不包含在内，status为None时不过滤状态"""
+        sql = (
+            "SELECT item.user_pin, MIN(item.expires_at) FROM jd_cookie_item AS item "
+            "JOIN jd_cookie ON jd_cookie.user_pin = item.user_pin "
+            "WHERE item.name = ? AND item.expires_at IS NOT NULL"
+        )
+        params = [name]
+        if status is not None:
+            sql += " AND jd_cookie.status = ?"
+            params.append(status)
+        return dict(self.fetchall(sql + " GROUP BY item.user_pin", params))
+
+    def accounts_expiring_within(self, seconds: float, now: float = None, name: str = 'pt_key') -> list:
+        """指定时间内过期的有效账号：[(user_pin, expires_at)]，按过期时间排序，已过期的也包含在内"""
+        now = now or time.time()
+        return self.fetchall(
+            "SELECT item.user_pin, MIN(item.expires_at) AS expires_at FROM jd_cookie_item AS item "
+            "JOIN jd_cookie ON jd_cookie.user_pin = item.user_pin "
+            "WHERE item.name = ? AND item.expires_at <= ? AND jd_cookie.status = 'active' "
+            "GROUP BY item.user_pin ORDER BY expires_at",
+            (name, now + seconds)
+        )
+
+    def iter_cookies(self, status: str = 'active', batch_size: int = 500):
+        """按id分页逐行返回账号Cookie：(user_pin, cookie, status, updated_at)，status为None时不过滤状态"""
+        last_id = 0
+        while True:
+            sql = "SELECT id, user_pin, cookie, status, updated_at FROM jd_cookie WHERE id > ?"
+            params = [last_id]
+            if status is not None:
+                sql += " AND status = ?"
+                params.append(status)
+            rows = self.fetchall(sql + " ORDER BY id LIMIT ?", params + [batch_size])
+            for row in rows:
+                yield row[1:]
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    def load_active_cookie(self):
+        """获取最近更新的有效Cookie字符串"""
+        result = self.fetchone(
+            "SELECT cookie FROM jd_cookie WHERE status = 'active' ORDER BY updated_at DESC, id DESC LIMIT 1"
+        )
+        return result[0] if result else None
+
+    def load_cookies(self, user_pins: list = None, status: str = 'active'):
+        """获取账号Cookie：[(user_pin, cookie, status, updated_at)]，status为None时不过滤状态"""
+        sql = "SELECT user_pin, cookie, status, updated_at FROM jd_cookie WHERE 1 = 1"
+        params = []
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        if user_pins:
+            sql += f" AND user_pin IN ({', '.join('?' * len(user_pins))})"
+            params.extend(user_pins)
+        return self.fetchall(sql + " ORDER BY id", params)
+
+    def update_cookie_statuses(self, statuses: list):
+        """批量更新账号状态，statuses为(status, user_pin)列表"""
+        with self.transaction('update_cookie_statuses') as conn:
+            conn.executemany(
+                "UPDATE jd_cookie SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE user_pin = ?",
+                statuses
+            )
+
+    def load_cookie_times(self, status: str = 'active'):
+        """获取账号Cookie及时间：[(user_pin, cookie, captured_at, synced_at, checked_at)]"""
+        return self.fetchall(
+            "SELECT user_pin, cookie, captured_at, synced_at, checked_at FROM jd_cookie WHERE status = ? ORDER BY id",
+            (status,)
+        )
+
+    def mark_cookies_synced(self, user_pins: list, synced_at: float = None):
+        """记录账号成功同步到所有面板的时间"""
+        synced_at = synced_at or time.time()
+        with self.transaction('mark_cookies_synced') as conn:
+            conn.executemany(
+                "UPDATE jd_cookie SET synced_at = ? WHERE user_pin = ?",
+                [(synced_at, user_pin) for user_pin in user_pins]
+            )
+
+    def mark_cookies_checked(self, user_pins: list, checked_at: float = None):
+        """记录账号Cookie最近一次检测的时间"""
+        checked_at = checked_at or time.time()
+        with self.transaction('mark_cookies_checked') as conn:
+            conn.executemany(
+                "UPDATE jd_cookie SET checked_at = ? WHERE user_pin = ?",
+                [(checked_at, user_pin) for user_pin in user_pins]
+            )
+
+    def delete_active_cookies(self):
+        """删除所有有效的Cookie"""
+        with self.transaction('delete_active_cookies') as conn:
+            conn.execute(
+                "DELETE FROM jd_cookie_item WHERE user_pin IN (SELECT user_pin FROM jd_cookie WHERE status = 'active')"
+            )
+            conn.execute("DELETE FROM jd_cookie WHERE status = 'active'")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage() -> Storage:
+    """获取全局共享的存储实例，首次调用时打开数据库并执行迁移"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = Storage(get_db_path())
+        return _storage
+
+def close_storage():
+    """关闭全局共享的存储实例"""
+    global _storage
+    with _storage_lock:
+        if _storage is not None:
+            _storage.close()
+            _storage = None
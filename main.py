@@ -10,16 +10,29 @@ author: Payne
 date: 2025-03-07
 """
 
+from core.startup_timeline import timeline
+
+import os
 import sys
-from datetime import datetime
-from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTextEdit, QLabel, QLineEdit, QMessageBox, QDialog
-from PyQt6.QtCore import QUrl
+from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTextEdit, QLabel, QLineEdit, QMessageBox, QDialog, QTabWidget, QTabBar, QComboBox, QTableView, QHeaderView, QAbstractItemView, QTableWidget, QTableWidgetItem
+from PyQt6.QtCore import QCoreApplication, Qt, QTimer
 from PyQt6.QtGui import QIcon
-from database.models import init_db
+from database.storage import get_storage, close_storage
+
+from core.panel_group import PanelGroup
+from core.job_executor import JobExecutor
+from core.env_table_model import EnvTableModel, EnvFilterProxyModel, STATUS_ALL, STATUS_ENABLED, STATUS_DISABLED
+from core.instrumentation import instrumentation, MemorySink
+from core.control_api import ControlServer, send_request
+
+# 启动后延迟执行首次数据库维护，之后每隔一段时间执行一次
+MAINTENANCE_DELAY_MS = 60 * 1000
+MAINTENANCE_INTERVAL_MS = 6 * 60 * 60 * 1000
+# 启动后延迟执行首次定时刷新
+REFRESH_DELAY_MS = 30 * 1000
 
-from core.cookie_manager import CookieManager
-from core.qinglong_panel import QinglongPanel
-from core.web_view_manager import WebViewManager
+# WebEngine相关模块在窗口显示后才导入，见MainWindow.init_web_engine
+timeline.mark('imports')
 
 class AboutDialog(QDialog):
     def __init__(self, parent=None):
@@ -61,6 +74,79 @@ class AboutDialog(QDialog):
         
         self.setLayout(layout)
 
+class StatsDialog(QDialog):
+    """显示本次运行的请求、数据库写入和Cookie事件统计"""
+
+    HEADERS = ['指标', '标签', '次数', '平均', '最大', '总计']
+
+    def __init__(self, metrics: MemorySink, resource_blocker=None, cache_path: str = None, parent=None):
+        super().__init__(parent)
+        self.metrics = metrics
+        self.resource_blocker = resource_blocker
+        self.cache_path = cache_path
+        self.setWindowTitle('运行统计')
+        self.resize(800, 500)
+
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+        # 请求过滤的放行和拦截次数
+        self.blocker_label = QLabel()
+        self.blocker_label.setWordWrap(True)
+        layout.addWidget(self.blocker_label)
+
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton('刷新')
+        refresh_button.clicked.connect(self.refresh)
+        reset_button = QPushButton('清空')
+        reset_button.clicked.connect(self.reset)
+        close_button = QPushButton('关闭')
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(refresh_button)
+        button_layout.addWidget(reset_button)
+        button_layout.addStretch()
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.refresh()
+
+    def refresh(self):
+        rows = self.metrics.snapshot()
+        self.table.setRowCount(len(rows))
+        for index, row in enumerate(rows):
+            labels = ', '.join(f'{key}={value}' for key, value in sorted(row['labels'].items()))
+            if row['kind'] == 'timer':
+                values = [f"{row['avg'] * 1000:.1f} ms", f"{row['max'] * 1000:.1f} ms", f"{row['total']:.2f} s"]
+            else:
+                values = [f"{row['avg']:g}", f"{row['max']:g}", f"{row['total']:g}"]
+            for column, text in enumerate([row['name'], labels, str(row['count'])] + values):
+                self.table.setItem(index, column, QTableWidgetItem(text))
+        self.table.resizeColumnToContents(0)
+        if self.resource_blocker is None:
+            self.blocker_label.setText('请求过滤：未启用')
+        else:
+            stats = self.resource_blocker.stats()
+            blocked = ', '.join(f'{name} {count}' for name, count in sorted(stats['blocked'].items()))
+            self.blocker_label.setText(
+                f"请求过滤：放行 {stats['allowed_total']} 个，拦截 {stats['blocked_total']} 个"
+                + (f"（{blocked}）" if blocked else '')
+            )
+        if self.cache_path:
+            from core.web_profile import directory_size
+            self.blocker_label.setText(
+                self.blocker_label.text() + f"\n网页缓存：{directory_size(self.cache_path) / 1024 / 1024:.1f} MB（{self.cache_path}）"
+            )
+
+    def reset(self):
+        self.metrics.reset()
+        if self.resource_blocker is not None:
+            self.resource_blocker.reset_stats()
+        self.refresh()
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -68,17 +154,39 @@ class MainWindow(QMainWindow):
         icon = QIcon('assets/app_icon.ico')
         self.setWindowIcon(icon)
         
-        # 初始化各个管理器
-        self.web_view_manager = WebViewManager()
-        self.cookie_manager = CookieManager(self.web_view_manager.get_web_view())
-        self.qinglong_panel = QinglongPanel()
+        # 账号会话在窗口显示后由init_web_engine创建
+        self.sessions = []
         
-        # 初始化数据库连接
-        self.conn = init_db()
+        # 共享的数据库存储
+        self.storage = get_storage()
+        timeline.mark('db_init')
+        # 所有已保存的青龙面板，由load_config在后台加载
+        self.panel_group = PanelGroup(panels=[])
+        # 面板请求和数据库操作在后台执行，避免界面卡顿
+        self.executor = JobExecutor(parent=self)
+        # 窗口关闭后不再提交新的后台任务
+        self._closing = False
+        self.sync_job = None
+        # 运行统计，在统计窗口中查看
+        self.metrics = instrumentation.add_sink(MemorySink())
+        # 本机控制接口，由main创建
+        self.control_server = None
         
         self.init_ui()
         # 加载保存的配置
         self.load_config()
+        # 定期清理Cookie历史版本，VACUUM按CookieRetention的间隔执行
+        self.maintenance_timer = QTimer(self)
+        self.maintenance_timer.setInterval(MAINTENANCE_INTERVAL_MS)
+        self.maintenance_timer.timeout.connect(self.run_maintenance)
+        self.maintenance_timer.start()
+        QTimer.singleShot(MAINTENANCE_DELAY_MS, self.run_maintenance)
+        # 按Cookie预计过期时间在后台检测和同步账号
+        self.refresh_scheduler = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.run_refresh_scheduler)
+        self.refresh_timer.start(REFRESH_DELAY_MS)
 
     def init_ui(self):
         # 设置窗口标题和大小
@@ -90,18 +198,23 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(central_widget)
         main_layout = QHBoxLayout(central_widget)
 
-        # 创建左侧WebView区域
+        # 创建左侧WebView区域，每个账号一个标签页
         web_layout = QVBoxLayout()
-        web_view = self.web_view_manager.get_web_view()
-        web_layout.addWidget(web_view)
+        self.account_tabs = QTabWidget()
+        self.account_tabs.setTabsClosable(True)
+        self.account_tabs.tabCloseRequested.connect(self.close_account)
+        web_layout.addWidget(self.account_tabs)
+        self.account_tabs.currentChanged.connect(self.on_account_changed)
         
-        # 添加刷新按钮
+        # 添加刷新和新增账号按钮
+        web_button_layout = QHBoxLayout()
         refresh_button = QPushButton('刷新页面')
-        refresh_button.clicked.connect(self.web_view_manager.reload_page)
-        web_layout.addWidget(refresh_button)
-        
-        # 连接Cookie更新信号
-        self.cookie_manager.cookies_updated.connect(self.update_cookie_display)
+        refresh_button.clicked.connect(lambda: self.web_view_manager.reload_page())
+        add_account_button = QPushButton('新增账号')
+        add_account_button.clicked.connect(self.add_account)
+        web_button_layout.addWidget(refresh_button)
+        web_button_layout.addWidget(add_account_button)
+        web_layout.addLayout(web_button_layout)
 
         # 创建右侧控制面板
         control_layout = QVBoxLayout()
@@ -118,8 +231,10 @@ class MainWindow(QMainWindow):
         button_layout = QHBoxLayout()
         self.copy_button = QPushButton('复制Cookie')
         self.sync_button = QPushButton('同步到青龙面板')
+        self.sync_all_button = QPushButton('同步全部账号')
         button_layout.addWidget(self.copy_button)
         button_layout.addWidget(self.sync_button)
+        button_layout.addWidget(self.sync_all_button)
         cookie_layout.addLayout(button_layout)
         
         # 青龙面板配置区域
@@ -127,6 +242,16 @@ class MainWindow(QMainWindow):
         config_layout = QVBoxLayout(config_group)
         config_layout.addWidget(QLabel('青龙面板配置：'))
         
+        # 已保存的面板，同步时会同时同步到所有面板
+        panel_selector_layout = QHBoxLayout()
+        self.panel_selector = QComboBox()
+        self.panel_selector.currentTextChanged.connect(self.show_panel_config)
+        panel_selector_layout.addWidget(self.panel_selector, 1)
+        self.remove_panel_button = QPushButton('删除面板')
+        self.remove_panel_button.clicked.connect(self.remove_panel)
+        panel_selector_layout.addWidget(self.remove_panel_button)
+        config_layout.addLayout(panel_selector_layout)
+        
         # 添加配置输入框
         self.panel_url = QLineEdit()
         self.panel_url.setPlaceholderText('青龙面板地址 (例如: http://localhost:5700)')
@@ -163,31 +288,108 @@ class MainWindow(QMainWindow):
         env_header_layout.addWidget(self.refresh_env_button)
         env_layout.addLayout(env_header_layout)
         
-        self.env_text = QTextEdit()
-        self.env_text.setReadOnly(True)
-        env_layout.addWidget(self.env_text)
+        # 按备注和状态筛选
+        env_filter_layout = QHBoxLayout()
+        self.env_filter = QLineEdit()
+        self.env_filter.setPlaceholderText('按备注筛选')
+        env_filter_layout.addWidget(self.env_filter, 1)
+        self.env_status_filter = QComboBox()
+        self.env_status_filter.addItem('全部', STATUS_ALL)
+        self.env_status_filter.addItem('已启用', STATUS_ENABLED)
+        self.env_status_filter.addItem('已禁用', STATUS_DISABLED)
+        env_filter_layout.addWidget(self.env_status_filter)
+        env_layout.addLayout(env_filter_layout)
+        
+        # 表格只绘制可见行，刷新时按行增量更新
+        self.env_model = EnvTableModel(self)
+        self.env_proxy = EnvFilterProxyModel(self)
+        self.env_proxy.setSourceModel(self.env_model)
+        self.env_filter.textChanged.connect(self.env_proxy.set_remarks_filter)
+        self.env_status_filter.currentIndexChanged.connect(
+            lambda: self.env_proxy.set_status_filter(self.env_status_filter.currentData())
+        )
+        self.env_table = QTableView()
+        self.env_table.setModel(self.env_proxy)
+        self.env_table.setSortingEnabled(True)
+        self.env_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.env_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.env_table.verticalHeader().setVisible(False)
+        self.env_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.env_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        env_layout.addWidget(self.env_table)
+        self.env_message = QLabel()
+        self.env_message.setWordWrap(True)
+        env_layout.addWidget(self.env_message)
 
         # 将各个区域添加到控制面板
         control_layout.addWidget(cookie_group)
         control_layout.addWidget(config_group)
         control_layout.addWidget(env_group)
 
-        # 添加关于按钮
+        # 添加统计和关于按钮
+        bottom_layout = QHBoxLayout()
+        stats_button = QPushButton('运行统计')
+        stats_button.clicked.connect(self.show_stats_dialog)
         about_button = QPushButton('关于')
         about_button.clicked.connect(self.show_about_dialog)
-        control_layout.addWidget(about_button)
+        bottom_layout.addWidget(stats_button)
+        bottom_layout.addWidget(about_button)
+        control_layout.addLayout(bottom_layout)
 
         # 设置布局比例
         main_layout.addLayout(web_layout, 7)
         main_layout.addLayout(control_layout, 3)
 
+        # 状态栏用于显示后台任务进度
+        self.statusBar()
+
         # 连接信号槽
         self.setup_connections()
 
+        # WebView创建完成前禁用依赖账号会话的按钮
+        self.session_buttons = [refresh_button, add_account_button, self.copy_button, self.sync_button, self.sync_all_button]
+        for button in self.session_buttons:
+            button.setEnabled(False)
+
+    def init_web_engine(self):
+        """窗口显示后再创建WebView和Cookie管理器，避免Chromium启动拖慢首屏"""
+        from core.account_session import AccountSession
+        from core.request_interceptor import ResourceBlocker
+        from core.web_profile import create_login_profile
+        from core.web_view_manager import get_low_memory_mode
+        
+        # 所有账号共用一个请求过滤器，拦截登录不需要的图片、字体和统计请求
+        self.resource_blocker = ResourceBlocker(parent=self)
+        self.low_memory = get_low_memory_mode()
+        # 默认账号使用持久化的登录Profile，页面缓存和Cookie保存在数据目录下；
+        # Profile挂在QApplication下，保证在所有页面释放之后才销毁
+        self.login_profile = create_login_profile(QApplication.instance())
+        self.default_session = AccountSession(
+            self.login_profile, load_saved=True,
+            request_interceptor=self.resource_blocker, low_memory=self.low_memory, parent=self
+        )
+        self.add_session(self.default_session)
+        # 默认账号不可关闭
+        self.account_tabs.tabBar().setTabButton(0, QTabBar.ButtonPosition.RightSide, None)
+        self.update_cookie_display(self.cookie_manager.cookie_str)
+        for button in self.session_buttons:
+            button.setEnabled(True)
+        timeline.mark('web_engine_ready')
+        
+        web_view = self.default_session.get_web_view()
+        web_view.loadFinished.connect(self.on_first_page_loaded)
+
+    def on_first_page_loaded(self, ok):
+        self.default_session.get_web_view().loadFinished.disconnect(self.on_first_page_loaded)
+        timeline.mark('first_page_load')
+        if timeline.is_report_enabled():
+            print(timeline.report())
+
     def setup_connections(self):
         # 这里先只连接基本的信号槽，具体实现后续添加
         self.copy_button.clicked.connect(self.copy_cookie)
         self.sync_button.clicked.connect(self.sync_to_panel)
+        self.sync_all_button.clicked.connect(self.sync_all_accounts)
         self.save_config.clicked.connect(self.save_panel_config)
         # 连接刷新环境变量列表按钮的信号
         self.refresh_env_button.clicked.connect(self.refresh_env_list)
@@ -196,6 +398,64 @@ class MainWindow(QMainWindow):
         dialog = AboutDialog(self)
         dialog.exec()
 
+    def show_stats_dialog(self):
+        login_profile = getattr(self, 'login_profile', None)
+        dialog = StatsDialog(
+            self.metrics, getattr(self, 'resource_blocker', None),
+            login_profile.cachePath() if login_profile is not None else None, self
+        )
+        dialog.exec()
+
+    @property
+    def current_session(self):
+        return self.sessions[max(self.account_tabs.currentIndex(), 0)]
+
+    @property
+    def web_view_manager(self):
+        return self.current_session.web_view_manager
+
+    @property
+    def cookie_manager(self):
+        return self.current_session.cookie_manager
+
+    def add_session(self, session):
+        """添加账号会话并创建对应的标签页"""
+        self.sessions.append(session)
+        session.cookie_manager.cookies_updated.connect(
+            lambda cookie_str: self.on_session_cookies_updated(session, cookie_str)
+        )
+        session.name_changed.connect(lambda name: self.on_session_name_changed(session, name))
+        return self.account_tabs.addTab(session.get_web_view(), session.account_name())
+
+    def add_account(self):
+        """新增一个独立登录的账号"""
+        from core.account_session import AccountSession
+        index = self.add_session(AccountSession(
+            request_interceptor=self.resource_blocker, low_memory=self.low_memory, parent=self
+        ))
+        self.account_tabs.setCurrentIndex(index)
+
+    def close_account(self, index):
+        if index == 0:
+            return
+        session = self.sessions.pop(index)
+        self.account_tabs.removeTab(index)
+        session.close()
+        session.deleteLater()
+
+    def on_account_changed(self, index):
+        if 0 <= index < len(self.sessions):
+            self.update_cookie_display(self.sessions[index].cookie_manager.cookie_str)
+
+    def on_session_name_changed(self, session, name):
+        if session in self.sessions:
+            self.account_tabs.setTabText(self.sessions.index(session), name)
+
+    def on_session_cookies_updated(self, session, cookie_str):
+        # 只显示当前标签页账号的Cookie
+        if session is self.current_session:
+            self.update_cookie_display(cookie_str)
+
     def update_cookie_display(self, cookie_str):
         self.cookie_text.setText(cookie_str)
     
@@ -208,98 +468,370 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.warning(self, '警告', '没有可用的Cookie')
 
+    def show_progress(self, message):
+        self.statusBar().showMessage(message)
+
     def sync_to_panel(self):
-        try:
-            # 获取必要的Cookie（仅pt_key和pt_pin）
-            cookie_str = self.cookie_manager.get_essential_cookies()
-            if not cookie_str:
-                raise Exception('请先获取有效的Cookie')
-            
-            # 从cookie中提取pt_pin作为备注
-            current_pin = self.cookie_manager.cookies.get('pt_pin', '')
-            
-            # 同步到青龙面板
-            self.qinglong_panel.sync_cookie(
+        # 同步进行中再次点击则取消同步
+        if self.sync_job is not None:
+            self.sync_job.cancel()
+            self.sync_button.setEnabled(False)
+            self.show_progress('正在取消同步...')
+            return
+        
+        # 获取必要的Cookie（仅pt_key和pt_pin）
+        cookie_str = self.cookie_manager.get_essential_cookies()
+        if not cookie_str:
+            QMessageBox.critical(self, '错误', '同步失败：请先获取有效的Cookie')
+            return
+        
+        # 从cookie中提取pt_pin作为备注
+        current_pin = self.cookie_manager.cookies.get('pt_pin', '')
+        
+        def sync(job):
+            job.report_progress('正在同步Cookie到青龙面板...')
+            return self.panel_group.sync_cookie(
                 cookie_str=cookie_str,
-                remarks=current_pin
+                remarks=current_pin,
+                cancel_event=job.cancel_event
             )
-            
-            QMessageBox.information(self, '成功', 'Cookie已成功同步到青龙面板')
-            
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'同步失败：{str(e)}')
+        
+        self.sync_button.setText('取消同步')
+        self.sync_job = self.executor.submit(
+            sync,
+            on_result=lambda results: self.show_panel_results(results, 'Cookie已成功同步到青龙面板'),
+            on_error=lambda error: QMessageBox.critical(self, '错误', f'同步失败：{error}'),
+            on_progress=self.show_progress,
+            on_cancelled=lambda: self.show_progress('同步已取消'),
+            on_finished=self.on_sync_finished
+        )
+
+    def sync_all_accounts(self):
+        """批量同步所有已登录账号"""
+        accounts = [
+            (session.cookie_manager.get_essential_cookies(), session.cookie_manager.cookies['pt_pin'])
+            for session in self.sessions
+            if session.cookie_manager.is_logged_in
+        ]
+        if not accounts:
+            QMessageBox.warning(self, '警告', '没有已登录的账号')
+            return
+        
+        def sync(job):
+            job.report_progress(f'正在同步{len(accounts)}个账号到青龙面板...')
+            return self.panel_group.sync_cookies(accounts, cancel_event=job.cancel_event)
+        
+        self.sync_all_button.setEnabled(False)
+        self.executor.submit(
+            sync,
+            on_result=lambda results: self.show_panel_results(results, f'{len(accounts)}个账号已成功同步到青龙面板'),
+            on_error=lambda error: QMessageBox.critical(self, '错误', f'同步失败：{error}'),
+            on_progress=self.show_progress,
+            on_finished=lambda: (self.sync_all_button.setEnabled(True), self.statusBar().clearMessage())
+        )
+
+    def show_panel_results(self, panel_results, success_message):
+        """汇总显示各面板的同步结果"""
+        failed = []
+        for panel_result in panel_results:
+            if panel_result.success:
+                continue
+            failed.append(f'{panel_result.panel_url}: {panel_result.error}')
+            for result in panel_result.results:
+                if not result.success:
+                    failed.append(f'    {result.remarks}: {result.error}')
+        if failed:
+            QMessageBox.warning(self, '部分失败', '以下面板同步失败：\n' + '\n'.join(failed))
+        elif len(panel_results) > 1:
+            QMessageBox.information(self, '成功', f'{success_message}（共{len(panel_results)}个面板）')
+        else:
+            QMessageBox.information(self, '成功', success_message)
+
+    def on_sync_finished(self):
+        self.sync_job = None
+        self.sync_button.setText('同步到青龙面板')
+        self.sync_button.setEnabled(True)
+        self.statusBar().clearMessage()
 
     def save_panel_config(self):
-        try:
-            panel_url = self.panel_url.text().strip()
-            client_id = self.client_id.text().strip()
-            client_secret = self.client_secret.text().strip()
-            
-            if not all([panel_url, client_id, client_secret]):
-                raise Exception('请填写完整的青龙面板配置信息')
-            
+        panel_url = self.panel_url.text().strip()
+        client_id = self.client_id.text().strip()
+        client_secret = self.client_secret.text().strip()
+        
+        if not all([panel_url, client_id, client_secret]):
+            QMessageBox.critical(self, '错误', '保存配置失败：请填写完整的青龙面板配置信息')
+            return
+        
+        def save(job):
+            job.report_progress('正在获取青龙面板Token...')
             # 保存配置并获取token
-            token = self.qinglong_panel.save_config(panel_url, client_id, client_secret)
-            
+            return self.panel_group.save_panel(panel_url, client_id, client_secret)
+        
+        def on_saved(token):
+            self.update_panel_selector(panel_url)
             # 更新token显示
             self.panel_token.setText(token)
-            
             QMessageBox.information(self, '成功', '青龙面板配置已保存')
-            
-        except Exception as e:
-            QMessageBox.critical(self, '错误', f'保存配置失败：{str(e)}')
+        
+        self.save_config.setEnabled(False)
+        self.executor.submit(
+            save,
+            on_result=on_saved,
+            on_error=lambda error: QMessageBox.critical(self, '错误', f'保存配置失败：{error}'),
+            on_progress=self.show_progress,
+            on_finished=lambda: (self.save_config.setEnabled(True), self.statusBar().clearMessage())
+        )
     
     def load_config(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "SELECT panel_url, client_id, client_secret, token FROM qinglong_config LIMIT 1"
-            )
-            result = cursor.fetchone()
-            
-            if result:
-                self.panel_url.setText(result[0])
-                self.client_id.setText(result[1])
-                self.client_secret.setText(result[2])
-                self.panel_token.setText(result[3])
-                
-        except Exception as e:
-            print(f"加载配置失败: {str(e)}")
+        def load(job):
+            self.panel_group.reload()
+            return self.storage.load_active_cookie()
+        
+        def on_loaded(cookie_str):
+            self.update_panel_selector()
+            # WebView尚未创建时先显示保存的Cookie
+            if not self.sessions and cookie_str:
+                self.update_cookie_display(cookie_str)
+        
+        self.executor.submit(
+            load,
+            on_result=on_loaded,
+            on_error=lambda error: print(f"加载配置失败: {error}")
+        )
+    
+    def run_refresh_scheduler(self):
+        """在后台处理一批到期的账号，完成后按下一个账号的到期时间重新计时"""
+        if self._closing:
+            return
+        if self.refresh_scheduler is None:
+            from core.refresh_scheduler import RefreshScheduler
+            self.refresh_scheduler = RefreshScheduler(panel_group=self.panel_group, storage=self.storage)
+        
+        def refresh(job):
+            return self.refresh_scheduler.run_due(job.cancel_event)
+        
+        def on_refreshed(result):
+            self.refresh_timer.start(int(result.next_run_in * 1000))
+            if result.synced or result.expired:
+                self.statusBar().showMessage(
+                    f'定时刷新：同步{len(result.synced)}个账号，{len(result.expired)}个账号已失效', 10000
+                )
+            elif result.expiring:
+                self.statusBar().showMessage(f"以下账号的Cookie即将过期，请重新登录：{'、'.join(result.expiring)}", 10000)
+        
+        def on_error(error):
+            print(f"定时刷新失败: {error}")
+            self.refresh_timer.start(REFRESH_DELAY_MS)
+        
+        self.executor.submit(refresh, on_result=on_refreshed, on_error=on_error)
+    
+    def run_maintenance(self):
+        """在后台压缩Cookie历史版本，到期时整理数据库"""
+        if self._closing:
+            return
+        from database.retention import CookieRetention
+        
+        def maintain(job):
+            return CookieRetention(self.storage).run()
+        
+        def on_finished(report):
+            if report.vacuumed or report.archived_versions:
+                print(f"数据库维护完成: 归档{report.archived_versions}个历史版本，释放{report.reclaimed_bytes}字节")
+        
+        self.executor.submit(
+            maintain,
+            on_result=on_finished,
+            on_error=lambda error: print(f"数据库维护失败: {error}")
+        )
+    
+    @property
+    def qinglong_panel(self):
+        """当前选中的青龙面板"""
+        panel = self.panel_group.get(self.panel_selector.currentText())
+        if panel is None:
+            raise Exception('请先配置青龙面板信息')
+        return panel
+    
+    def update_panel_selector(self, current_url=None):
+        """刷新已保存面板的下拉列表"""
+        self.panel_selector.blockSignals(True)
+        self.panel_selector.clear()
+        self.panel_selector.addItems([panel.panel_url for panel in self.panel_group.panels()])
+        if current_url:
+            self.panel_selector.setCurrentText(current_url)
+        self.panel_selector.blockSignals(False)
+        self.remove_panel_button.setEnabled(self.panel_selector.count() > 0)
+        self.show_panel_config(self.panel_selector.currentText())
+    
+    def show_panel_config(self, panel_url):
+        panel = self.panel_group.get(panel_url)
+        if panel is None:
+            return
+        self.panel_url.setText(panel.panel_url)
+        self.client_id.setText(panel.client_id)
+        self.client_secret.setText(panel.client_secret)
+        self.panel_token.setText(panel.token or '')
+    
+    def remove_panel(self):
+        panel_url = self.panel_selector.currentText()
+        if not panel_url:
+            return
+        if QMessageBox.question(self, '确认', f'确定删除面板 {panel_url} 吗？') != QMessageBox.StandardButton.Yes:
+            return
+        self.executor.submit(
+            lambda job: self.panel_group.remove_panel(panel_url),
+            on_result=lambda _: self.update_panel_selector(),
+            on_error=lambda error: QMessageBox.critical(self, '错误', f'删除面板失败：{error}')
+        )
     
+    def control_handlers(self) -> dict:
+        """本机控制接口的命令，见core.control_api"""
+        return {
+            'activate': self.on_control_activate,
+            'sync': self.on_control_sync,
+            'envs': self.on_control_envs,
+            'cookie_status': self.on_control_cookie_status,
+        }
+
+    def on_control_activate(self, args, reply):
+        """再次启动程序时显示已运行的窗口"""
+        if args.get('argv'):
+            print(f"收到启动参数: {' '.join(args['argv'])}")
+        self.showNormal()
+        self.raise_()
+        self.activateWindow()
+        reply({'pid': os.getpid()})
+
+    def on_control_sync(self, args, reply):
+        """同步当前账号，args['all']为True时同步所有已登录账号"""
+        if args.get('all'):
+            sessions = self.sessions
+        else:
+            sessions = [self.current_session] if self.sessions else []
+        accounts = [
+            (session.cookie_manager.get_essential_cookies(), session.cookie_manager.cookies['pt_pin'])
+            for session in sessions
+            if session.cookie_manager.is_logged_in
+        ]
+        if not accounts:
+            reply(error='没有已登录的账号')
+            return
+        self.executor.submit(
+            lambda job: self.panel_group.sync_cookies(accounts, cancel_event=job.cancel_event),
+            on_result=lambda panel_results: reply([
+                dict(panel_result.__dict__, results=[result.__dict__ for result in panel_result.results])
+                for panel_result in panel_results
+            ]),
+            on_error=lambda error: reply(error=error)
+        )
+
+    def on_control_envs(self, args, reply):
+        """获取面板的环境变量，args可指定panel（面板地址）和search（筛选内容）"""
+        panel = self.panel_group.get(args['panel']) if args.get('panel') else self.qinglong_panel
+        if panel is None:
+            reply(error=f"未配置面板: {args['panel']}")
+            return
+        self.executor.submit(
+            lambda job: panel.get_envs(search_value=args.get('search')),
+            on_result=lambda envs: reply([dict(env) for env in envs]),
+            on_error=lambda error: reply(error=error)
+        )
+
+    def on_control_cookie_status(self, args, reply):
+        """各账号的登录状态和pt_key过期时间，args['include_cookie']为True时包含Cookie"""
+        status = []
+        for session in self.sessions:
+            cookie_manager = session.cookie_manager
+            item = {
+                'user_pin': cookie_manager.cookies.get('pt_pin'),
+                'logged_in': cookie_manager.is_logged_in,
+                'expires_at': cookie_manager.cookie_attrs.get('pt_key', (None, None, None))[2],
+                'page_released': session.web_view_manager.suspended,
+            }
+            if args.get('include_cookie'):
+                item['cookie'] = cookie_manager.get_essential_cookies()
+            status.append(item)
+        reply(status)
+
     def closeEvent(self, event):
-        if self.conn:
-            self.conn.close()
+        if not self._closing:
+            self._closing = True
+            if self.control_server is not None:
+                self.control_server.close()
+            self.maintenance_timer.stop()
+            self.refresh_timer.stop()
+            # 写入尚未刷新的Cookie
+            for session in self.sessions:
+                session.cookie_manager.shutdown()
+            self.executor.cancel_all()
+            if self.executor.active_count():
+                # 已取消的任务可能还在等待面板响应或重试，不阻塞界面线程：
+                # 先隐藏窗口，任务全部结束后再关闭数据库连接并退出
+                self.hide()
+                self.executor.drained.connect(self.finish_close)
+                event.ignore()
+                return
+            self.release_resources()
         event.accept()
 
+    def finish_close(self):
+        """后台任务全部结束后释放资源并退出"""
+        self.release_resources()
+        QCoreApplication.quit()
+
+    def release_resources(self):
+        close_storage()
+        instrumentation.close()
+
     def refresh_env_list(self):
         """刷新环境变量列表"""
         try:
-            env_vars = self.qinglong_panel.get_env_list()
-            if env_vars:
-                # 格式化环境变量信息
-                env_text = ''
-                for env in env_vars:
-                    # 转换时间戳为可读格式
-                    update_time = env.get('updatedAt')
-                    dt = datetime.fromisoformat(update_time.replace('Z', '+00:00'))
-                    update_time = dt.strftime('%Y-%m-%d %H:%M:%S')
-                    env_text += f"名称: {env['name']}\n"
-                    env_text += f"备注: {env.get('remarks', '无')}\n"
-                    env_text += f"状态: {'已启用' if env['status'] == 0 else '已禁用'}\n"
-                    env_text += f"更新时间: {update_time}\n"
-                    env_text += '-' * 50 + '\n'
-                
-                self.env_text.setText(env_text)
-            else:
-                self.env_text.setText('暂无环境变量')
-                
+            panel = self.qinglong_panel
         except Exception as e:
-            self.env_text.setText(f'获取环境变量失败: {str(e)}')
+            self.env_message.setText(f'获取环境变量失败: {str(e)}')
+            return
+        
+        def fetch(job):
+            job.report_progress('正在获取环境变量列表...')
+            return panel.get_env_list()
+        
+        def on_fetched(env_vars):
+            self.env_model.update_envs(env_vars)
+            self.env_message.setText('' if env_vars else '暂无环境变量')
+        
+        self.refresh_env_button.setEnabled(False)
+        self.executor.submit(
+            fetch,
+            on_result=on_fetched,
+            on_error=lambda error: self.env_message.setText(f'获取环境变量失败: {error}'),
+            on_progress=self.show_progress,
+            on_finished=lambda: (self.refresh_env_button.setEnabled(True), self.statusBar().clearMessage())
+        )
 
 def main():
+    # 已有实例在运行时把启动参数交给它并直接退出，不再启动第二个Chromium和数据库连接
+    try:
+        if send_request('activate', {'argv': sys.argv[1:]}) is not None:
+            print('程序已在运行')
+            return
+    except Exception as e:
+        print(f"连接已运行的实例失败: {str(e)}")
+    # 延迟导入QtWebEngineWidgets时必须在创建QApplication前设置
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
+    control_server = ControlServer({}, parent=app)
+    if not control_server.listen():
+        # 另一个实例恰好同时启动
+        send_request('activate', {'argv': sys.argv[1:]})
+        return
+    instrumentation.configure_from_env()
+    timeline.mark('app_created')
     window = MainWindow()
+    control_server.handlers.update(window.control_handlers())
+    window.control_server = control_server
     window.show()
+    timeline.mark('window_shown')
+    QTimer.singleShot(0, window.init_web_engine)
     sys.exit(app.exec())
 
 if __name__ == '__main__':
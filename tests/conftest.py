@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from benchmarks.mock_qinglong import MockQinglongServer
+from core.http_transport import get_transport
+from core.resilience import reset_panel_guards
+from database.storage import close_storage
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """每个测试使用独立的数据目录和面板状态"""
+    monkeypatch.setenv('JD_HELPER_HOME', str(tmp_path))
+    reset_panel_guards()
+    yield tmp_path
+    reset_panel_guards()
+    close_storage()
+
+@pytest.fixture
+def mock_panel():
+    with MockQinglongServer(env_count=4) as server:
+        yield server
+        # 连接池中的长连接不能带到下一个测试
+        get_transport(server.url).close()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import io
+from benchmarks.mock_qinglong import CLIENT_ID, CLIENT_SECRET
+from core.account_io import import_accounts, validate_account, FORMAT_CSV
+from core.panel_group import PanelGroup
+from database.storage import get_storage
+
+def test_imported_pt_pin_is_decoded():
+    # 导入的Cookie与界面登录保存的Cookie格式一致
+    assert validate_account('pt_key=k1;pt_pin=%E4%B8%AD', '%E4%B8%AD') == ('中', 'pt_key=k1; pt_pin=中; ', 'active')
+    assert validate_account('pt_key=k1; pt_pin=中;')[1] == 'pt_key=k1; pt_pin=中; '
+
+def test_import_reports_sync_errors_per_account(mock_panel):
+    group = PanelGroup()
+    group.save_panel(mock_panel.url, CLIENT_ID, CLIENT_SECRET)
+    data = 'user_pin,cookie,status\n,pt_key=k1; pt_pin=a,active\n,pt_key=k2; pt_pin=b,expired\n,pt_key=k3; pt_pin=c,active\n'
+    report = import_accounts(io.StringIO(data), FORMAT_CSV, panel_group=group)
+    assert (report.imported, report.synced, report.sync_errors) == (3, 2, [])
+    assert {row[0] for row in get_storage().load_cookies()} == {'a', 'c'}
+
+    mock_panel.state.error_rate = 1.0
+    report = import_accounts(io.StringIO(data), FORMAT_CSV, panel_group=group)
+    assert report.synced == 0
+    assert [error['user_pin'] for error in report.sync_errors] == ['a', 'c']
+
+def test_duplicate_rows_are_counted_once():
+    data = 'pt_key=k1; pt_pin=a\npt_key=k2; pt_pin=b\npt_key=k3; pt_pin=a\npt_key=k4; pt_pin=a\nbroken\n'
+    # 批量大小为2时重复的账号分布在不同的批次中
+    report = import_accounts(io.StringIO(data), chunk_size=2)
+    assert (report.total, report.imported, report.skipped, len(report.errors)) == (5, 2, 2, 1)
+    assert dict((row[0], row[1]) for row in get_storage().load_cookies()) == {
+        'a': 'pt_key=k4; pt_pin=a; ', 'b': 'pt_key=k2; pt_pin=b; '
+    }
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+from core.cookie_utils import parse_cookie_str, format_essential_cookies, format_cookie_header
+
+def test_essential_cookies():
+    cookies = parse_cookie_str('a=1; pt_key=k; pt_pin=%E4%B8%AD;')
+    assert format_essential_cookies(cookies) == 'pt_key=k; pt_pin=中;'
+    assert format_cookie_header(cookies) == 'pt_key=k; pt_pin=%E4%B8%AD;'
+
+def test_empty_jar_renders_empty_string():
+    # 调用方用空字符串判断是否已经获取到Cookie
+    assert format_essential_cookies({}) == ''
+    assert format_essential_cookies({'a': '1'}) == ''
+    assert format_cookie_header({}) == ''
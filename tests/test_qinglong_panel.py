@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from benchmarks.mock_qinglong import CLIENT_ID, CLIENT_SECRET, MockQinglongHandler
+from core.qinglong_panel import QinglongPanel, COOKIE_ENV_NAME
+
+def test_streamed_panel_error_without_message(mock_panel, monkeypatch):
+    # 面板返回业务错误但没有message，流式读取的响应体已经被消费
+    monkeypatch.setattr(MockQinglongHandler, '_get_envs', lambda handler, query: handler._send(200, {'code': 500}))
+    panel = QinglongPanel((mock_panel.url, CLIENT_ID, CLIENT_SECRET, None, None))
+    with pytest.raises(Exception, match='获取环境变量失败: code=500'):
+        panel.get_envs()
+
+def test_bulk_sync_recovers_from_stale_mirror(mock_panel):
+    panel = QinglongPanel((mock_panel.url, CLIENT_ID, CLIENT_SECRET, None, None))
+    panel.get_cookie_envs()
+    # 镜像有效期内变量在面板上被删除
+    deleted = panel.env_mirror.get(COOKIE_ENV_NAME, 'jd_user0')
+    del mock_panel.state.envs[deleted['id']]
+    results = panel.sync_cookies([
+        ('pt_key=new0; pt_pin=jd_user0;', 'jd_user0'),
+        ('pt_key=new1; pt_pin=jd_user1;', 'jd_user1'),
+    ])
+    assert [(result.action, result.success) for result in results] == [('create', True), ('update', True)]
+    values = {env['remarks']: env['value'] for env in mock_panel.state.envs.values()}
+    assert values['jd_user0'] == 'pt_key=new0; pt_pin=jd_user0;'
+    assert values['jd_user1'] == 'pt_key=new1; pt_pin=jd_user1;'
+    assert mock_panel.state.request_counts['GET /open/envs'] == 2
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import socket
+import threading
+import time
+import pytest
+import requests
+from benchmarks.mock_qinglong import CLIENT_ID, CLIENT_SECRET
+from core.qinglong_panel import QinglongPanel
+from core.rate_limiter import TokenBucket
+from core.resilience import RetryPolicy, PanelGuard, CircuitBreaker, CircuitOpenError, RateLimitTimeout, get_panel_guard
+
+# 不等待退避，测试只关心重试次数
+NO_BACKOFF = RetryPolicy(max_retries=2, backoff_base=0)
+
+def closed_port_url() -> str:
+    """分配一个端口后立即释放，得到一个没有服务监听的地址"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{sock.getsockname()[1]}'
+
+def make_panel(server, policy=NO_BACKOFF):
+    panel = QinglongPanel((server.url, CLIENT_ID, CLIENT_SECRET, None, None), retry_policy=policy)
+    # 先在没有故障时取得token，之后的请求计数只包含业务请求
+    panel.token_manager.get_token()
+    return panel
+
+@pytest.mark.parametrize('fault', ['error_rate', 'reset_rate'])
+def test_idempotent_get_is_retried(mock_panel, fault):
+    panel = make_panel(mock_panel)
+    setattr(mock_panel.state, fault, 1.0)
+    with pytest.raises(Exception, match='获取环境变量'):
+        panel.get_envs()
+    assert mock_panel.state.request_counts['GET /open/envs'] == NO_BACKOFF.max_retries + 1
+
+class RecoveringPolicy(RetryPolicy):
+    """第一次重试前清除面板故障，模拟短暂的面板错误"""
+
+    def __init__(self, server):
+        super().__init__(max_retries=2, backoff_base=0)
+        self.server = server
+
+    def backoff(self, attempt: int) -> float:
+        self.server.state.error_rate = 0.0
+        return 0
+
+def test_get_succeeds_after_transient_error(mock_panel):
+    panel = make_panel(mock_panel, RecoveringPolicy(mock_panel))
+    mock_panel.state.error_rate = 1.0
+    assert len(panel.get_envs()) == 4
+    assert mock_panel.state.request_counts['GET /open/envs'] == 2
+
+@pytest.mark.parametrize('fault', ['error_rate', 'reset_rate'])
+def test_post_is_not_retried_once_sent(mock_panel, fault):
+    panel = make_panel(mock_panel)
+    setattr(mock_panel.state, fault, 1.0)
+    with pytest.raises(Exception, match='创建环境变量'):
+        panel.create_envs([{'name': 'JD_COOKIE', 'value': 'pt_key=a; pt_pin=b;', 'remarks': 'b'}])
+    assert mock_panel.state.request_counts['POST /open/envs'] == 1
+
+def test_post_is_retried_when_connect_fails():
+    # 没有服务监听的端口，请求一定没有到达面板
+    url = closed_port_url()
+    guard = PanelGuard(url, rate=None)
+    attempts = []
+
+    def send():
+        attempts.append(1)
+        return requests.post(url + '/open/envs', json=[], timeout=1)
+
+    with pytest.raises(requests.ConnectionError):
+        guard.execute('POST', send, NO_BACKOFF)
+    assert len(attempts) == NO_BACKOFF.max_retries + 1
+
+def test_breaker_opens_after_threshold_and_allows_one_probe(mock_panel):
+    guard = PanelGuard(mock_panel.url, rate=None, failure_threshold=3, recovery_timeout=0.3)
+    policy = RetryPolicy(max_retries=0)
+    session = requests.Session()
+    path = 'GET /jd/userinfo'
+
+    def send():
+        return session.get(mock_panel.url + '/jd/userinfo', timeout=5)
+
+    mock_panel.state.error_rate = 1.0
+    for _ in range(3):
+        assert guard.execute('GET', send, policy).status_code == 500
+    assert guard.breaker.state == CircuitBreaker.OPEN
+    # 熔断期间请求不会发出
+    with pytest.raises(CircuitOpenError):
+        guard.execute('GET', send, policy)
+    assert mock_panel.state.request_counts[path] == 3
+
+    # 恢复时间过后只放行一个探测请求，探测进行中的其他请求直接失败
+    time.sleep(0.35)
+    mock_panel.state.error_rate = 0.0
+    mock_panel.state.latency = 0.3
+    probe = {}
+    thread = threading.Thread(target=lambda: probe.setdefault('status', guard.execute('GET', send, policy).status_code))
+    thread.start()
+    time.sleep(0.1)
+    with pytest.raises(CircuitOpenError):
+        guard.execute('GET', send, policy)
+    thread.join()
+    assert probe['status'] == 200
+    assert mock_panel.state.request_counts[path] == 4
+    assert guard.breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_request()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+def test_token_bucket_throttles_panel_requests(mock_panel):
+    guard = PanelGuard(mock_panel.url, rate=50, burst=5)
+    session = requests.Session()
+    start = time.monotonic()
+    for _ in range(30):
+        guard.execute('GET', lambda: session.get(mock_panel.url + '/jd/userinfo', timeout=5), NO_BACKOFF)
+    # 突发的5个请求之后每秒最多50个
+    assert time.monotonic() - start >= (30 - 5) / 50 * 0.9
+    assert mock_panel.state.request_counts['GET /jd/userinfo'] == 30
+
+def test_rate_limit_timeout_is_reported_as_panel_error(mock_panel):
+    panel = make_panel(mock_panel)
+    guard = get_panel_guard(mock_panel.url)
+    guard.set_rate(0.1, burst=1)
+    guard.acquire_timeout = 0.05
+    guard.rate_limiter.try_acquire()
+    with pytest.raises(Exception, match='获取环境变量失败: 请求过于频繁') as error:
+        panel.get_envs()
+    assert not isinstance(error.value, RateLimitTimeout)
+    assert 'GET /open/envs' not in mock_panel.state.request_counts
+
+def test_guard_raises_rate_limit_timeout():
+    guard = PanelGuard('http://127.0.0.1:1', rate=0.1, burst=1, acquire_timeout=0.05)
+    guard.rate_limiter.try_acquire()
+    with pytest.raises(RateLimitTimeout):
+        guard.execute('GET', lambda: None, NO_BACKOFF)
+
+def test_token_bucket_limits_burst():
+    bucket = TokenBucket(rate=1, capacity=3)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.acquire(timeout=0.01) is False
+
+def test_connection_reusable_after_injected_error(mock_panel):
+    session = requests.Session()
+    mock_panel.state.error_rate = 1.0
+    assert session.put(mock_panel.url + '/open/envs', json={'id': 1}, timeout=5).status_code == 500
+    mock_panel.state.error_rate = 0.0
+    assert session.get(mock_panel.url + '/jd/userinfo', timeout=5).status_code == 200
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sqlite3
+import pytest
+from database import storage
+from database.storage import Storage, MIGRATIONS, get_db_path
+
+def table_columns(conn, table: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def test_migrations_reach_latest_version(data_dir):
+    db = Storage(get_db_path())
+    assert db.conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    assert 'checked_at' in table_columns(db.conn, 'jd_cookie')
+    db.conn.close()
+
+def test_failed_migration_is_rolled_back(data_dir, monkeypatch):
+    db_path = os.path.join(str(data_dir), 'migrate.db')
+
+    def crash_after_alter(conn):
+        conn.execute("ALTER TABLE jd_cookie ADD COLUMN captured_at REAL")
+        raise RuntimeError('迁移中断')
+
+    # 第一条ALTER TABLE之后异常退出，列和版本号都不能留下
+    monkeypatch.setattr(storage, 'MIGRATIONS', MIGRATIONS[:3] + [crash_after_alter])
+    with pytest.raises(RuntimeError):
+        Storage(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 3
+    assert 'captured_at' not in table_columns(conn, 'jd_cookie')
+    conn.close()
+
+    # 重新启动时迁移可以完整执行
+    monkeypatch.setattr(storage, 'MIGRATIONS', MIGRATIONS)
+    db = Storage(db_path)
+    assert db.conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    db.conn.close()